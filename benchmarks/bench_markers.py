@@ -0,0 +1,57 @@
+"""
+Compare the map payload size and build time of the per-row CircleMarker mode with the single GeoJSON layer.
+
+    python benchmarks/bench_markers.py --sizes 100 10000 100000 --output markers.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from hawker_visualization import PlotHawkerCentres
+
+def GeneratePoints(n_points, seed = 0):
+    """
+    Function:   Synthetic visualization data in the shape returned by PrepareVisData
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"Hawker Centre {index}" for index in range(n_points)]
+    return pd.DataFrame({
+        "clean_name": names,
+        "latitude_hc": 1.27 + rng.random(n_points) * 0.17,
+        "longitude_hc": 103.64 + rng.random(n_points) * 0.35,
+        "colour": rng.choice(["green", "#FF5F1F", "red"], n_points),
+        "descr": [f"{name} currently open. Next closure is from 01 Jan 2024 to 02 Jan 2024." for name in names],
+    })
+
+def RunBenchmark(sizes, modes):
+    results = []
+    for size in sizes:
+        dataframe = GeneratePoints(size)
+        for marker_mode in modes:
+            start = time.perf_counter()
+            map_html = PlotHawkerCentres([dataframe], marker_mode = marker_mode)
+            seconds = time.perf_counter() - start
+            result = {"points": size, "mode": marker_mode, "build_s": round(seconds, 4),
+                      "payload_bytes": len(map_html.encode()), "bytes_per_point": round(len(map_html.encode()) / size, 1)}
+            print(json.dumps(result))
+            results.append(result)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [100, 10_000, 100_000])
+    parser.add_argument("--modes", nargs = "+", default = ["markers", "geojson"])
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = RunBenchmark(args.sizes, args.modes)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "markers", "results": results}, file, indent = 2)
@@ -0,0 +1,149 @@
+"""
+Latency of the nearest open hawker centre lookup, in process and through /api/nearest under gunicorn at fixed
+request rates.
+
+    python benchmarks/bench_nearest.py --records 1000 --rates 250 500 1000 --duration 10 --output nearest.json
+
+The HTTP load is open loop: every request is scheduled at a fixed time and its latency counts from then, so a
+server that falls behind the rate shows up as growing latency instead of a lower request rate. The load is sent
+from several client processes, each with its own share of the rate.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCHMARK_DIR, "..", "src")
+sys.path.insert(0, BENCHMARK_DIR)
+
+from bench_serving import GetFreePort, SERVER_COMMANDS, WaitUntilServing
+from run_benchmarks import Summarise
+from stub_server import StartStubServer
+from synthetic import GenerateRecords
+
+# Bounding box of Singapore that the query points are drawn from
+LATITUDES, LONGITUDES = (1.25, 1.45), (103.65, 104.0)
+
+def RandomPoint(rng):
+    return rng.uniform(*LATITUDES), rng.uniform(*LONGITUDES)
+
+def BenchmarkLookup(stub_url, n_queries, k):
+    """
+    Function:   Time GetNearestOpenCentres in this process, without HTTP
+    """
+    os.environ["HAWKER_API_URL"] = stub_url
+    os.environ["HAWKER_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix = "hawker-bench-")
+    os.environ["HAWKER_REFRESH_INTERVAL"] = "0"
+    sys.path.insert(0, SRC_DIR)
+    from hawker_index import GetNearestOpenCentres
+
+    rng = random.Random(0)
+    GetNearestOpenCentres(*RandomPoint(rng), k = k)
+    timings = []
+    for _ in range(n_queries):
+        latitude, longitude = RandomPoint(rng)
+        start = time.perf_counter()
+        GetNearestOpenCentres(latitude, longitude, k = k)
+        timings.append(time.perf_counter() - start)
+    return {"queries": n_queries, "k": k, **Summarise(timings)}
+
+def SendPacedRequests(base_url, rate, duration, threads, k, seed):
+    """
+    Function:   Send requests at the given rate for duration seconds from this process. Returns the latencies
+                counted from the scheduled send times, the number of failed requests and the time the last 
+                response arrived, relative to the first scheduled send.
+    """
+    import requests
+
+    def Worker(thread_id, latencies, failures):
+        session = requests.Session()
+        rng = random.Random(seed * 1000 + thread_id)
+        interval = threads / rate
+        scheduled = start + thread_id * interval / threads
+        while scheduled < start + duration:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            latitude, longitude = RandomPoint(rng)
+            try:
+                response = session.get(f"{base_url}/api/nearest", params = {"lat": latitude, "lon": longitude, "k": k}, timeout = 30)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - scheduled)
+            except requests.RequestException:
+                failures.append(scheduled)
+            scheduled += interval
+
+    latencies, failures = [], []
+    start = time.perf_counter() + 0.5
+    workers = [threading.Thread(target = Worker, args = (thread_id, latencies, failures)) for thread_id in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, len(failures), time.perf_counter() - start
+
+def _SendPacedRequests(arguments):
+    return SendPacedRequests(*arguments)
+
+def BenchmarkApi(stub_url, rates, duration, clients, threads, k, workers):
+    """
+    Function:   Serve the app with gunicorn and send requests to /api/nearest at each of the given total rates
+    """
+    port = GetFreePort()
+    env = dict(os.environ, HAWKER_API_URL = stub_url, HAWKER_SNAPSHOT_DIR = tempfile.mkdtemp(prefix = "hawker-bench-"),
+               HAWKER_HOST = "127.0.0.1", HAWKER_PORT = str(port), HAWKER_WEB_WORKERS = str(workers), HAWKER_DEBUG = "0")
+    process = subprocess.Popen(SERVER_COMMANDS["gunicorn"], cwd = SRC_DIR, env = env,
+                               stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        WaitUntilServing(f"{base_url}/api/nearest?lat=1.35&lon=103.82", process)
+        runs = []
+        for rate in rates:
+            arguments = [(base_url, rate / clients, duration, threads, k, seed) for seed in range(clients)]
+            with multiprocessing.Pool(clients) as pool:
+                results = pool.map(_SendPacedRequests, arguments)
+
+            latencies = [latency for client_latencies, _, _ in results for latency in client_latencies]
+            failures = sum(client_failures for _, client_failures, _ in results)
+            elapsed = max(client_elapsed for _, _, client_elapsed in results)
+            run = {"target_rate": rate, "achieved_rate": round(len(latencies) / elapsed, 2), "failures": failures,
+                   **Summarise(latencies)}
+            print(json.dumps(run))
+            runs.append(run)
+    finally:
+        process.terminate()
+        process.wait(timeout = 30)
+    return {"duration_s": duration, "clients": clients, "threads": threads, "workers": workers, "runs": runs}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type = int, default = 1000)
+    parser.add_argument("--k", type = int, default = 5)
+    parser.add_argument("--queries", type = int, default = 20000, help = "in process lookups")
+    parser.add_argument("--rates", type = float, nargs = "+", default = [250, 500, 1000], help = "requests per second to /api/nearest")
+    parser.add_argument("--duration", type = float, default = 10)
+    parser.add_argument("--clients", type = int, default = 4, help = "client processes sending the load")
+    parser.add_argument("--threads", type = int, default = 16, help = "threads per client process")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    stub = StartStubServer(GenerateRecords(args.records))
+    results = {"records": args.records, "cpus": os.cpu_count()}
+    # The lookup is timed in a child process, so that the app modules are not imported into the load clients
+    with multiprocessing.Pool(1) as pool:
+        results["lookup"] = pool.apply(BenchmarkLookup, (stub.url, args.queries, args.k))
+    print(json.dumps(results["lookup"]))
+    results["api"] = BenchmarkApi(stub.url, args.rates, args.duration, args.clients, args.threads, args.k, args.workers)
+    stub.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
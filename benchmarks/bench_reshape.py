@@ -0,0 +1,106 @@
+"""
+Compare the vectorized reshaping in hawker_data with the original row-by-row implementation.
+
+    python benchmarks/bench_reshape.py --sizes 200 10000 1000000 --output reshape.json
+
+Both pipelines must produce identical dataframes (values, dtypes and index) for every size.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from hawker_data import RecordsToRawData, ProcessRawData
+from synthetic import GenerateRecords
+
+def LegacyCleanUpName(name):
+    pattern = r"\((.*)\)"
+    try:
+        return re.search(pattern, name).group(1)
+    except:
+        return name
+
+def LegacyExtractClosureType(activity_name):
+    result = re.search(r"(.*)?((start|end)date)", activity_name)
+    activity, datetype = result.group(1), result.group(2)
+    return re.sub("_", " ", activity).strip(), datetype
+
+def LegacyExtractRemarkType(activity_name):
+    activity = re.sub("_", " ", re.search(r"(remarks)_(.*)", activity_name).group(2)).strip()
+    if activity.startswith("q"):
+        activity += " cleaning"
+    return activity
+
+def LegacyProcessRawData(raw_data_df):
+    """
+    Function:   The reshaping pipeline before vectorization, including the date parsing done in GetHCFigures
+    """
+    raw_data_df = raw_data_df.rename(columns = {"name":"original_name"})
+    raw_data_df["clean_name"] = raw_data_df["original_name"].apply(lambda name: LegacyCleanUpName(name))
+    hc_cols = ['original_name', 'clean_name', 'description_myenv','address_myenv', 'no_of_market_stalls', 'no_of_food_stalls', 
+            'status', 'latitude_hc', 'longitude_hc', 'photourl']
+    cleaning_cols = ['clean_name'] + [col for col in raw_data_df.columns if col.endswith("date")]
+    remarks_cols = ['clean_name'] + [col for col in raw_data_df.columns if col.startswith("remarks")]
+
+    hawker_centre_df = raw_data_df[hc_cols].copy()
+    hawker_centre_df["latitude_hc"] = hawker_centre_df["latitude_hc"].astype(float)
+    hawker_centre_df["longitude_hc"] = hawker_centre_df["longitude_hc"].astype(float)
+
+    cleaning_dates_df = raw_data_df[cleaning_cols].melt(id_vars = ["clean_name"], var_name = "activity", value_name = "date")
+    cleaning_dates_df = cleaning_dates_df[(cleaning_dates_df["date"] != "TBC") & (cleaning_dates_df["date"] != "NA")].copy()
+    cleaning_dates_df["result"] = cleaning_dates_df["activity"].apply(lambda activity_name: LegacyExtractClosureType(activity_name))
+    cleaning_dates_df["activity"] = cleaning_dates_df["result"].apply(lambda result: result[0])
+    cleaning_dates_df["datetype"] = cleaning_dates_df["result"].apply(lambda result: result[1])
+    cleaning_dates_df.drop(columns = ["result"], inplace = True)
+    cleaning_dates_df = pd.pivot(cleaning_dates_df, index = ["clean_name", "activity"], columns = "datetype", values = "date").reset_index()
+    cleaning_dates_df = cleaning_dates_df[["clean_name", "activity", "startdate", "enddate"]].copy()
+    cleaning_dates_df["startdate"] = pd.to_datetime(cleaning_dates_df['startdate'], format = "%d/%m/%Y")
+    cleaning_dates_df["enddate"] = pd.to_datetime(cleaning_dates_df['enddate'], format = "%d/%m/%Y")
+
+    remarks_df = raw_data_df[remarks_cols].melt(id_vars = ["clean_name"], var_name = "activity", value_name = "remarks")
+    remarks_df = remarks_df[remarks_df["remarks"] != "nil"].copy()
+    remarks_df["activity"] = remarks_df["activity"].apply(lambda activity_name: LegacyExtractRemarkType(activity_name))
+    return hawker_centre_df, cleaning_dates_df, remarks_df
+
+def Time(function, raw_data_df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = function(raw_data_df.copy())
+        timings.append(time.perf_counter() - start)
+    return min(timings), frames
+
+def RunBenchmark(sizes, repeat):
+    results = []
+    for size in sizes:
+        raw_data_df = RecordsToRawData(GenerateRecords(size))
+        legacy_seconds, legacy_frames = Time(LegacyProcessRawData, raw_data_df, repeat)
+        vectorized_seconds, vectorized_frames = Time(ProcessRawData, raw_data_df, repeat)
+
+        # Columns added since, such as the radians of CleanUpHCData, have no legacy counterpart
+        for legacy_df, vectorized_df in zip(legacy_frames, vectorized_frames):
+            pd.testing.assert_frame_equal(legacy_df, vectorized_df[legacy_df.columns], check_exact = True)
+
+        result = {"records": size, "legacy_s": round(legacy_seconds, 4), "vectorized_s": round(vectorized_seconds, 4),
+                  "speedup": round(legacy_seconds / vectorized_seconds, 2)}
+        print(json.dumps(result))
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [200, 10_000, 1_000_000])
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = RunBenchmark(args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"benchmark": "reshape", "pandas": pd.__version__, "results": results}, file, indent = 2)
@@ -0,0 +1,119 @@
+"""
+Load test the Dash development server against gunicorn, both serving the app against the local data.gov.sg stub.
+
+    python benchmarks/bench_serving.py --records 1000 --output serving.json
+
+Each server runs in its own process with its own snapshot directory. For every endpoint the throughput, 
+latency and response size with and without compression are reported.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCHMARK_DIR, "..", "src")
+sys.path.insert(0, BENCHMARK_DIR)
+
+from run_benchmarks import LoadTest, TabCallbackBody
+from stub_server import StartStubServer
+from synthetic import GenerateRecords
+
+SERVER_COMMANDS = {
+    # What the Dockerfile ran before: the Flask development server with the debugger and reloader
+    "development": [sys.executable, "app.py"],
+    "gunicorn": [sys.executable, "-m", "gunicorn", "wsgi:server"],
+}
+
+def GetFreePort():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def WaitUntilServing(url, process, timeout = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(url, timeout = 5).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} did not start within {timeout}s")
+
+def GetResponseSizes(url, json_body = None):
+    """
+    Function:   Response size in bytes for each Accept-Encoding
+    """
+    sizes = {}
+    for encoding in ["identity", "gzip", "br"]:
+        headers = {"Accept-Encoding": encoding}
+        if json_body is None:
+            response = requests.get(url, headers = headers, stream = True, timeout = 60)
+        else:
+            response = requests.post(url, json = json_body, headers = headers, stream = True, timeout = 60)
+        sizes[encoding] = len(response.raw.read())
+    return sizes
+
+def BenchmarkServer(mode, stub_url, concurrency, n_requests, workers):
+    port = GetFreePort()
+    env = dict(os.environ, HAWKER_API_URL = stub_url, HAWKER_SNAPSHOT_DIR = tempfile.mkdtemp(prefix = "hawker-bench-"),
+               HAWKER_HOST = "127.0.0.1", HAWKER_PORT = str(port), HAWKER_WEB_WORKERS = str(workers),
+               HAWKER_DEBUG = "1" if mode == "development" else "0")
+    process = subprocess.Popen(SERVER_COMMANDS[mode], cwd = SRC_DIR, env = env,
+                               stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        WaitUntilServing(f"{base_url}/_dash-layout", process)
+        # Render the map once so that its URL is known
+        tab = json.dumps(requests.post(f"{base_url}/_dash-update-component", json = TabCallbackBody("tab-map"), timeout = 120).json())
+        map_url = base_url + tab[tab.index("/hawker-map/"):tab.index(".html") + len(".html")]
+
+        endpoints = {
+            "index": (f"{base_url}/", None),
+            "layout": (f"{base_url}/_dash-layout", None),
+            "map_tab": (f"{base_url}/_dash-update-component", TabCallbackBody("tab-map")),
+            "table_tab": (f"{base_url}/_dash-update-component", TabCallbackBody("tab-table")),
+            "map_html": (map_url, None),
+        }
+        results = {"mode": mode}
+        for endpoint, (url, json_body) in endpoints.items():
+            results[endpoint] = {**LoadTest(url, concurrency, n_requests, json_body),
+                                 "bytes": GetResponseSizes(url, json_body)}
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout = 30)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type = int, default = 1000)
+    parser.add_argument("--concurrency", type = int, default = 16)
+    parser.add_argument("--requests", type = int, default = 500)
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--modes", nargs = "+", default = list(SERVER_COMMANDS), choices = list(SERVER_COMMANDS))
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    stub = StartStubServer(GenerateRecords(args.records))
+    results = {"records": args.records, "workers": args.workers, "runs": []}
+    for mode in args.modes:
+        run = BenchmarkServer(mode, stub.url, args.concurrency, args.requests, args.workers)
+        results["runs"].append(run)
+        for endpoint, stats in run.items():
+            if endpoint != "mode":
+                print(f"{mode:<12} {endpoint:<10} {stats['requests_per_s']:>8} req/s  p95 {stats['p95_s']:>8}s  "
+                      f"{stats['bytes']['identity']:>8} B, gzip {stats['bytes']['gzip']:>7} B, br {stats['bytes']['br']:>7} B")
+    stub.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
@@ -0,0 +1,98 @@
+"""
+Measure the startup cost of the app process: the import time of app.py, broken down by module with
+python -X importtime, and the time until a gunicorn master has warmed up from the persisted snapshot.
+
+    python benchmarks/bench_startup.py --runs 5 --output startup.json
+
+The warm-up runs with the data.gov.sg URL pointing at a closed port, so it has to be served by the snapshot on disk.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCHMARK_DIR, "..", "src")
+sys.path.insert(0, BENCHMARK_DIR)
+
+from run_benchmarks import GetCommit
+from stub_server import StartStubServer
+from synthetic import GenerateRecords
+
+# Prints the seconds taken by importing the app, then by warming it up when wsgi is imported
+WARM_UP_SCRIPT = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+import wsgi
+print(imported - start, time.perf_counter() - imported)
+"""
+
+def ParseImportTime(stderr):
+    """
+    Function:   Cumulative import time in seconds of every module imported by app.py directly, and of app.py itself
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth <= 1:
+            modules[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+def MeasureImports(runs, env):
+    """
+    Function:   Median import time per module over fresh interpreters
+    """
+    samples = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd = SRC_DIR, env = env,
+                                capture_output = True, text = True, check = True)
+        for module, seconds in ParseImportTime(result.stderr).items():
+            samples.setdefault(module, []).append(seconds)
+    medians = {module: round(statistics.median(seconds), 4) for module, seconds in samples.items()}
+    return dict(sorted(medians.items(), key = lambda item: -item[1]))
+
+def MeasureWarmUp(runs, env):
+    """
+    Function:   Median seconds of importing the app and of warming it up from the persisted snapshot
+    """
+    import_seconds, warm_up_seconds = [], []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", WARM_UP_SCRIPT], cwd = SRC_DIR, env = env, text = True)
+        seconds = output.strip().splitlines()[-1].split()
+        import_seconds.append(float(seconds[0]))
+        warm_up_seconds.append(float(seconds[1]))
+    return {"runs": runs, "import_s": round(statistics.median(import_seconds), 4),
+            "warm_up_s": round(statistics.median(warm_up_seconds), 4)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type = int, default = 1000)
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    env = dict(os.environ, HAWKER_SNAPSHOT_DIR = tempfile.mkdtemp(prefix = "hawker-bench-"), HAWKER_REFRESH_INTERVAL = "0")
+    imports = MeasureImports(args.runs, env)
+
+    # Persist a snapshot from the stub, then warm up from it with the data source unreachable
+    stub = StartStubServer(GenerateRecords(args.records))
+    subprocess.check_output([sys.executable, "-c", "import wsgi"], cwd = SRC_DIR, env = dict(env, HAWKER_API_URL = stub.url))
+    stub.shutdown()
+    warm_up = MeasureWarmUp(args.runs, dict(env, HAWKER_API_URL = "http://127.0.0.1:9/unreachable", HAWKER_FETCH_RETRIES = "0"))
+
+    results = {"benchmark": "startup", "commit": GetCommit(), "records": args.records,
+               "import_app_s": imports.get("app"), "warm_up": warm_up, "imports": imports}
+    print(f"import app: {warm_up['import_s']}s, warm up from the snapshot: {warm_up['warm_up_s']}s")
+    for module, seconds in list(imports.items())[:15]:
+        print(f"{module:<40} {seconds:>8}s")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
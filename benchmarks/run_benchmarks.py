@@ -0,0 +1,203 @@
+"""
+Benchmark every stage of the dashboard against a local stub of data.gov.sg and write the results to JSON.
+
+    python benchmarks/run_benchmarks.py --records 120 1000 --output results.json
+    python benchmarks/run_benchmarks.py --records 120 --compare results.json
+
+Stages: fetch and process (GetHawkerData), status classification, map rendering (PlotHawkerCentres),
+data table (CreateDataTable) and the end-to-end layout request served under concurrent load.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCHMARK_DIR, "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from stub_server import StartStubServer
+from synthetic import GenerateRecords
+
+def Summarise(timings):
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "min_s": round(timings[0], 5),
+        "median_s": round(statistics.median(timings), 5),
+        "p95_s": round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 5),
+    }
+
+def TimeRuns(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return Summarise(timings)
+
+def LoadTest(url, concurrency, n_requests, json_body = None):
+    """
+    Function:   Send n_requests GETs (or POSTs of json_body) from concurrency threads, returning throughput 
+                and latency percentiles
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize = concurrency)
+    session.mount("http://", adapter)
+
+    def Request(_):
+        start = time.perf_counter()
+        if json_body is None:
+            response = session.get(url, timeout = 60)
+        else:
+            response = session.post(url, json = json_body, timeout = 60)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency) as executor:
+        timings = list(executor.map(Request, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "requests": n_requests, "requests_per_s": round(n_requests / elapsed, 2), **Summarise(timings)}
+
+def TabCallbackBody(tab_id):
+    """
+    Function:   Request body of the callback that renders the body of the selected tab
+    """
+    return {
+        "output": "..hawker-tab-content.children...hawker-view-state.data..",
+        "outputs": [{"id": "hawker-tab-content", "property": "children"}, {"id": "hawker-view-state", "property": "data"}],
+        "inputs": [{"id": "hawker-tabs", "property": "active_tab", "value": tab_id}],
+        "changedPropIds": ["hawker-tabs.active_tab"],
+        "state": [],
+    }
+
+def StartAppServer(server):
+    import logging
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    http_server = make_server("127.0.0.1", 0, server, threaded = True)
+    threading.Thread(target = http_server.serve_forever, daemon = True).start()
+    return http_server, f"http://127.0.0.1:{http_server.server_port}"
+
+def RunBenchmarks(n_records, repeat, concurrency, n_requests):
+    """
+    Function:   Benchmark all stages for one dataset size. Must run in a fresh process, as the app reads its
+                configuration at import time.
+    """
+    stub = StartStubServer(GenerateRecords(n_records))
+    os.environ["HAWKER_API_URL"] = stub.url
+    os.environ["HAWKER_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix = "hawker-bench-")
+    os.environ["HAWKER_REFRESH_INTERVAL"] = "0"
+
+    import pandas as pd
+    from dashboard_tabs import CombineHawkerData, CreateDataTable, CacheTableData
+    from hawker_data import GetHawkerData
+    from hawker_status import StatusClassifier, ClassifyHawkerCentres
+    from hawker_visualization import GetHCFigures, PlotHawkerCentres
+
+    results = {"records": n_records}
+    results["get_hawker_data"] = TimeRuns(lambda: GetHawkerData(), repeat)
+
+    hawker_centre_df, cleaning_dates_df, remarks_df = GetHawkerData()
+    classifier = StatusClassifier(cleaning_dates_df)
+    results["classify"] = TimeRuns(lambda: ClassifyHawkerCentres(cleaning_dates_df), repeat)
+    dates = pd.date_range(cleaning_dates_df["startdate"].min(), periods = 365, freq = "D")
+    results["classify_365_dates"] = TimeRuns(lambda: [classifier.Classify(date) for date in dates], max(repeat // 5, 1))
+
+    from hawker_calendar import AvailabilityMatrix
+    results["availability_matrix"] = TimeRuns(lambda: AvailabilityMatrix(hawker_centre_df, cleaning_dates_df), repeat)
+    calendar = AvailabilityMatrix(hawker_centre_df, cleaning_dates_df)
+    results["availability_aggregate"] = TimeRuns(lambda: calendar.Aggregate(calendar.days[0], calendar.days[-1], "week"), repeat)
+
+    vis_dfs = GetHCFigures()[:3]
+    results["plot_hawker_centres"] = TimeRuns(lambda: PlotHawkerCentres(list(vis_dfs)), repeat)
+
+    hawker_df, hawker_centre_df, _, _ = CombineHawkerData()
+    results["create_data_table"] = TimeRuns(lambda: CreateDataTable(CacheTableData(hawker_df, hawker_centre_df)), repeat)
+
+    # Changes of the views a week apart, as sent to an open dashboard
+    from hawker_changes import CreateCentreView, DiffCentreViews
+    view = CreateCentreView(hawker_df, hawker_centre_df)
+    next_week_df = pd.concat(GetHCFigures(as_of = pd.Timestamp.now() + pd.Timedelta(days = 7))[:3])
+    next_week_view = CreateCentreView(next_week_df, hawker_centre_df)
+    results["diff_centre_views"] = TimeRuns(lambda: DiffCentreViews(view, next_week_view), repeat)
+
+    from app import server
+    http_server, base_url = StartAppServer(server)
+    try:
+        results["layout_under_load"] = LoadTest(f"{base_url}/_dash-layout", concurrency, n_requests)
+        results["map_tab_under_load"] = LoadTest(f"{base_url}/_dash-update-component", concurrency, n_requests,
+                                                 TabCallbackBody("tab-map"))
+    finally:
+        http_server.shutdown()
+        stub.shutdown()
+    return results
+
+def GetCommit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd = BENCHMARK_DIR, text = True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def Compare(results, baseline):
+    """
+    Function:   Print the median (or throughput) ratio of every stage against a previous results file
+    """
+    baseline_runs = {run["records"]: run for run in baseline["runs"]}
+    for run in results["runs"]:
+        old_run = baseline_runs.get(run["records"])
+        if old_run is None:
+            continue
+        for stage, stats in run.items():
+            if stage not in old_run or not isinstance(stats, dict):
+                continue
+            if "requests_per_s" in stats:
+                print(f"{run['records']:>8} {stage:<24} {old_run[stage]['requests_per_s']:>10} -> {stats['requests_per_s']:>10} req/s")
+            else:
+                ratio = stats["median_s"] / old_run[stage]["median_s"] if old_run[stage]["median_s"] else float("nan")
+                print(f"{run['records']:>8} {stage:<24} {old_run[stage]['median_s']:>10} -> {stats['median_s']:>10} s ({ratio:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type = int, nargs = "+", default = [120, 1000])
+    parser.add_argument("--repeat", type = int, default = 10)
+    parser.add_argument("--concurrency", type = int, default = 8)
+    parser.add_argument("--requests", type = int, default = 200)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--single", type = int, help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(RunBenchmarks(args.single, args.repeat, args.concurrency, args.requests)))
+        sys.exit(0)
+
+    # Each size runs in its own process so that module level caches and configuration start clean
+    runs = []
+    for n_records in args.records:
+        output = subprocess.check_output([sys.executable, __file__, "--single", str(n_records), "--repeat", str(args.repeat),
+                                          "--concurrency", str(args.concurrency), "--requests", str(args.requests)], text = True)
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+        print(json.dumps(runs[-1]))
+
+    import pandas as pd
+    results = {"benchmark": "stages", "commit": GetCommit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+               "python": platform.python_version(), "pandas": pd.__version__, "runs": runs}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
+    if args.compare:
+        with open(args.compare) as file:
+            Compare(results, json.load(file))
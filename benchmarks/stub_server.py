@@ -0,0 +1,92 @@
+"""
+Local stub of the data.gov.sg datastore_search endpoint.
+
+    python benchmarks/stub_server.py --records 1000 --port 8050
+    HAWKER_API_URL=http://127.0.0.1:8050/api/action/datastore_search python src/app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic import GenerateRecords, GeneratePayload
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/api/action/datastore_search":
+            self.send_error(404)
+            return
+
+        stub = self.server
+        query = parse_qs(url.query)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        stub.requests.append(offset)
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        if offset in stub.fail_offsets or stub.rng.random() < stub.failure_rate:
+            if not stub.error_payload:
+                self.send_error(503)
+                return
+            # data.gov.sg also reports errors as a 200 response with success set to false
+            payload = {"help": "", "success": False, "error": {"__type": "Internal Server Error", "message": "Stub failure"}}
+        else:
+            payload = GeneratePayload(stub.records, offset, limit)
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Class:  Serves the given records page by page. Pages can be slowed down with latency, and made
+            to fail at random (failure_rate) or always (fail_offsets), with a 503 or with an error payload.
+    """
+    daemon_threads = True
+
+    def __init__(self, records, host = "127.0.0.1", port = 0, latency = 0, failure_rate = 0, fail_offsets = (), seed = 0,
+                 error_payload = False):
+        super().__init__((host, port), StubHandler)
+        self.records = records
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.error_payload = error_payload
+        self.fail_offsets = set(fail_offsets)
+        self.rng = random.Random(seed)
+        self.requests = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/action/datastore_search"
+
+def StartStubServer(records, **kwargs):
+    """
+    Function:   Start a stub server in a daemon thread. Call server.shutdown() to stop it.
+    """
+    server = StubServer(records, **kwargs)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type = int, default = 120)
+    parser.add_argument("--port", type = int, default = 8050)
+    parser.add_argument("--latency", type = float, default = 0)
+    parser.add_argument("--failure-rate", type = float, default = 0)
+    args = parser.parse_args()
+
+    server = StubServer(GenerateRecords(args.records), port = args.port, latency = args.latency, failure_rate = args.failure_rate)
+    print(f"Serving {args.records} records at {server.url}")
+    server.serve_forever()
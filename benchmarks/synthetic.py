@@ -0,0 +1,71 @@
+"""
+Synthetic datastore_search records with the same schema as the hawker centre closure dataset
+"""
+import random
+from datetime import date, timedelta
+
+def GenerateRecord(index, rng, year = None, other_works_rate = 0.2, max_cleaning_days = 4, max_works_days = 120):
+    """
+    Function:   Create one raw hawker centre record with quarterly cleaning windows and optional other works
+    """
+    year = year or date.today().year
+    base = date(year, 1, 1)
+    name = f"Blk {index} Hawker Centre ({index} Food Centre)" if index % 2 else f"Market {index}"
+    record = {
+        "_id": index + 1,
+        "serial_no": str(index + 1),
+        "name": name,
+        "description_myenv": "Market & Food Centre" if index % 3 else "Food Centre",
+        "address_myenv": f"Blk {index}, Singapore {100000 + index}",
+        "no_of_market_stalls": str(rng.randint(0, 200)),
+        "no_of_food_stalls": str(rng.randint(10, 100)),
+        "status": "Existing",
+        "latitude_hc": f"{1.27 + rng.random() * 0.17:.6f}",
+        "longitude_hc": f"{103.64 + rng.random() * 0.35:.6f}",
+        "photourl": f"https://www.nea.gov.sg/photos/{index}.jpg",
+        "google_3d_view": f"https://www.google.com/maps/@{index}",
+    }
+    for quarter in range(1, 5):
+        if rng.random() < 0.1:
+            startdate = enddate = "TBC"
+        else:
+            start = base + timedelta(days = (quarter - 1) * 91 + rng.randint(0, 85))
+            startdate = start.strftime("%d/%m/%Y")
+            enddate = (start + timedelta(days = rng.randint(0, max_cleaning_days))).strftime("%d/%m/%Y")
+        record[f"q{quarter}_cleaningstartdate"] = startdate
+        record[f"q{quarter}_cleaningenddate"] = enddate
+        record[f"remarks_q{quarter}"] = "nil" if rng.random() < 0.8 else "Cleaning of high areas"
+
+    if rng.random() < other_works_rate:
+        start = base + timedelta(days = rng.randint(0, 364))
+        record["other_works_startdate"] = start.strftime("%d/%m/%Y")
+        record["other_works_enddate"] = (start + timedelta(days = rng.randint(7, max_works_days))).strftime("%d/%m/%Y")
+        record["remarks_other_works"] = "Repairs and Redecoration works"
+    else:
+        record["other_works_startdate"] = "NA"
+        record["other_works_enddate"] = "NA"
+        record["remarks_other_works"] = "nil"
+    return record
+
+def GenerateRecords(n_records, seed = 0, year = None, **window_kwargs):
+    """
+    Function:   Create n_records records. window_kwargs are passed to GenerateRecord to scale the closure windows.
+    """
+    rng = random.Random(seed)
+    return [GenerateRecord(index, rng, year, **window_kwargs) for index in range(n_records)]
+
+def GeneratePayload(records, offset = 0, limit = None):
+    """
+    Function:   Wrap records in a datastore_search response for the given page
+    """
+    limit = len(records) if limit is None else limit
+    return {
+        "help": "https://data.gov.sg/api/3/action/help_show?name=datastore_search",
+        "success": True,
+        "result": {
+            "records": records[offset:offset + limit],
+            "limit": limit,
+            "offset": offset,
+            "total": len(records),
+        },
+    }
@@ -1,15 +1,211 @@
 import dash
-from dash import html
+import pandas as pd
+from dash import dcc, html
 import dash_bootstrap_components as dbc
+from flask import abort, g, jsonify, make_response, request
+from flask_compress import Compress
+import brotli
+import cProfile
+import gzip
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlparse
 
-from info import info_tab
-from dashboard_tabs import CreateDashboardTabs
+from dashboard_tabs import MAP_TAB, TABLE_TAB, CALENDAR_TAB, INFO_TAB, PrebuildTabContents
+from hawker_calendar import GetAvailabilityMatrix, PERIODS
+from hawker_cache import GetSnapshotCache, LRUCache
+from hawker_fetch import FetchError
+from hawker_index import GetNearestOpenCentres
+from hawker_visualization import GetHawkerMapHtml
+from hawker_scheduler import StartRefreshScheduler
+from hawker_metrics import registry, request_seconds, response_bytes
+import config
 
-app = dash.Dash(external_stylesheets=[dbc.themes.SIMPLEX]) # MATERIA JOURNAL MORPH SANDSTONE SIMPLEX 
+logger = logging.getLogger(__name__)
+
+# The tab bodies are rendered by callbacks, so their components are not in the initial layout.
+# Without a name, Dash inspects the call stack to find one, which is slow.
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SIMPLEX], suppress_callback_exceptions = True) # MATERIA JOURNAL MORPH SANDSTONE SIMPLEX 
 app.title = "SG Hawkers"
 
 server = app.server
 
+# Compress the layout, callback and map responses, brotli for browsers that accept it
+server.config.update(
+    COMPRESS_ALGORITHM = ["br", "gzip"],
+    COMPRESS_MIMETYPES = ["text/html", "text/css", "text/plain", "application/json", "application/javascript", "text/javascript"],
+    COMPRESS_MIN_SIZE = 500,
+    SEND_FILE_MAX_AGE_DEFAULT = config.STATIC_MAX_AGE,
+)
+Compress(server)
+
+def GetEndpoint(path):
+    """
+    Function:   Metrics label of a request path
+    """
+    endpoints = {"/": "index", "/_dash-layout": "layout", "/_dash-update-component": "callback", "/metrics": "metrics"}
+    if path.startswith("/hawker-map/"):
+        return "map"
+    if path.startswith("/api/"):
+        return "api"
+    return endpoints.get(path, "other")
+
+def IsProfilingRequested():
+    """
+    Function:   True if the request or the page it came from has the profile=1 query flag
+    """
+    if not config.PROFILING_ENABLED:
+        return False
+    if request.args.get("profile") == "1":
+        return True
+    referrer_query = parse_qs(urlparse(request.referrer or "").query)
+    return referrer_query.get("profile") == ["1"]
+
+@server.before_request
+def StartRequestTimer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if IsProfilingRequested():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@server.after_request
+def RecordRequestMetrics(response):
+    endpoint = GetEndpoint(request.path)
+    if getattr(g, "profiler", None) is not None:
+        g.profiler.disable()
+        os.makedirs(config.PROFILE_DIR, exist_ok = True)
+        profile_file = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint}.prof")
+        g.profiler.dump_stats(profile_file)
+        response.headers["X-Profile-File"] = profile_file
+
+    # Dash bundles are fingerprinted with their version, so they never change under the same URL
+    if request.path.startswith("/_dash-component-suites/") and response.cache_control.max_age:
+        response.cache_control.max_age = config.STATIC_MAX_AGE
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+
+    request_seconds.Observe(time.perf_counter() - g.request_start, endpoint = endpoint)
+    if response.content_length is not None:
+        response_bytes.Set(response.content_length, endpoint = endpoint)
+    return response
+
+@server.route("/metrics")
+def ServeMetrics():
+    """
+    Function:   Metrics of this worker process in the Prometheus text format
+    """
+    response = make_response(registry.Render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
+
+# The map of a version never changes, so it is compressed once per encoding instead of on every request
+compressed_map_cache = LRUCache(config.MAP_CACHE_SIZE * 2, "compressed_map")
+MAP_ENCODINGS = {"br": lambda data: brotli.compress(data, quality = 5), "gzip": gzip.compress}
+
+def CompressMapHtml(map_version, map_html, encoding):
+    """
+    Function:   The map html compressed with the given encoding, cached per map version
+    """
+    cache_key = (map_version, encoding)
+    map_bytes = compressed_map_cache.Get(cache_key)
+    if map_bytes is None:
+        map_bytes = MAP_ENCODINGS[encoding](map_html.encode("utf-8"))
+        compressed_map_cache.Put(cache_key, map_bytes)
+    return map_bytes
+
+@server.route("/hawker-map/<map_version>.html")
+def ServeHawkerMap(map_version):
+    """
+    Function:   Serve the rendered folium map. The URL contains the map version so the response never changes
+                and browsers may cache it, revalidating with the ETag.
+    """
+    map_html = GetHawkerMapHtml(map_version)
+    if map_html is None:
+        abort(404)
+
+    encoding = request.accept_encodings.best_match(list(MAP_ENCODINGS))
+    if encoding is None:
+        response = make_response(map_html)
+        response.set_etag(map_version)
+    else:
+        response = make_response(CompressMapHtml(map_version, map_html, encoding))
+        response.headers["Content-Encoding"] = encoding
+        response.set_etag(f"{map_version}:{encoding}")
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    response.vary.add("Accept-Encoding")
+    return response.make_conditional(request)
+
+def ParseTimeParameter(name):
+    """
+    Function:   The query parameter as a naive timestamp in Singapore time, or None if it is not given.
+                A time with an offset is converted to Singapore time. Raises ValueError if it is empty or not a time.
+    """
+    if name not in request.args:
+        return None
+    timestamp = pd.Timestamp(request.args[name])
+    # An empty parameter parses as NaT instead of raising
+    if timestamp is pd.NaT:
+        raise ValueError(f"{name} is empty")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(config.TIMEZONE).tz_localize(None)
+    return timestamp
+
+@server.route("/api/availability")
+def ServeAvailability():
+    """
+    Function:   Open hawker centres and stalls per day, or the daily average per week or month, within the 
+                date range given by the start and end query parameters (YYYY-MM-DD, inclusive)
+    """
+    period = request.args.get("period", "day")
+    if period not in PERIODS:
+        abort(400, f"period must be one of {', '.join(PERIODS)}")
+    try:
+        range_start, range_end = ParseTimeParameter("start"), ParseTimeParameter("end")
+    except ValueError:
+        abort(400, "start and end must be dates in the YYYY-MM-DD format")
+    if range_start is not None and range_end is not None and range_end < range_start:
+        abort(400, "end must not be before start")
+
+    try:
+        calendar = GetAvailabilityMatrix()
+    except FetchError:
+        abort(503, "The hawker centre data could not be loaded from data.gov.sg")
+    aggregate_df = calendar.Aggregate(range_start, range_end, period).reset_index()
+    aggregate_df["date"] = aggregate_df["date"].dt.strftime("%Y-%m-%d")
+    return jsonify({
+        "calendar_start": calendar.days[0].strftime("%Y-%m-%d"),
+        "calendar_end": calendar.days[-1].strftime("%Y-%m-%d"),
+        "period": period,
+        "data": aggregate_df.round(2).to_dict("records"),
+    })
+
+@server.route("/api/nearest")
+def ServeNearest():
+    """
+    Function:   The k hawker centres nearest to the lat and lon query parameters that are open at the time given by 
+                at (ISO format, Singapore time unless it has an offset, now by default), with their distance in km, 
+                status and the closure window the status refers to
+    """
+    try:
+        latitude, longitude = float(request.args["lat"]), float(request.args["lon"])
+        k = int(request.args.get("k", config.NEAREST_K))
+        as_of = ParseTimeParameter("at")
+    except (KeyError, ValueError):
+        abort(400, "lat and lon must be numbers, k an integer and at a time in the ISO format")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        abort(400, "lat must be within [-90, 90] and lon within [-180, 180]")
+    if not 1 <= k <= config.NEAREST_MAX_K:
+        abort(400, f"k must be within [1, {config.NEAREST_MAX_K}]")
+
+    try:
+        centres = GetNearestOpenCentres(latitude, longitude, None if as_of is None else as_of.to_pydatetime(), k)
+    except FetchError:
+        abort(503, "The hawker centre data could not be loaded from data.gov.sg")
+    return jsonify({"lat": latitude, "lon": longitude, "k": k, "centres": centres})
+
 def update_layout():
     navbar = dbc.Navbar(
         [
@@ -35,30 +231,69 @@ def update_layout():
         style={"border":"none"},
     )
 
-    hc_map_tab, hawker_table_tab = CreateDashboardTabs()
+    # Only the tab headers are in the layout, the body of the active tab is rendered by RenderTabContent
     tabs = dbc.Tabs(
         [
-        dbc.Tab(hc_map_tab, id="label_tab1", label="Hawker Centre Map",), 
-        dbc.Tab(hawker_table_tab, id = "label_tab3", label = "Hawker Centre Data Table",), 
-        dbc.Tab(info_tab, id="label_tab5", label="Additional Information",), 
+        dbc.Tab(id="label_tab1", tab_id = MAP_TAB, label="Hawker Centre Map",), 
+        dbc.Tab(id = "label_tab3", tab_id = TABLE_TAB, label = "Hawker Centre Data Table",), 
+        dbc.Tab(id = "label_tab4", tab_id = CALENDAR_TAB, label = "Closure Calendar",), 
+        dbc.Tab(id="label_tab5", tab_id = INFO_TAB, label="Additional Information",), 
         ],
+        id = "hawker-tabs",
+        active_tab = MAP_TAB,
         style = {
             "font-size": 15, 
             "font-weight": "bold",
             },
     )
 
+    # The view state shown by the tabs and the changes since then, polled by an open dashboard, see PollChanges
+    change_feed = [
+        dcc.Store(id = "hawker-view-state"),
+        dcc.Store(id = "hawker-changes"),
+        dcc.Interval(id = "hawker-changes-interval", interval = max(config.CHANGE_POLL_INTERVAL, 1) * 1000, 
+                     disabled = config.CHANGE_POLL_INTERVAL <= 0),
+    ]
+
     layout = html.Div(
         [
             navbar,
             tabs,
+            html.Div(id = "hawker-tab-content"),
+            *change_feed,
         ],
         style={}
     )
     return layout
 
-app.layout = update_layout
+def WarmUp(n_limit = 200):
+    """
+    Function:   Load the hawker snapshot and build the map and table before serving. Under gunicorn this runs 
+                once in the master process, so the forked workers share the loaded data. If there is no data
+                to load, the workers still start and their schedulers fetch it instead.
+    """
+    # A stale snapshot is refreshed by the workers, not in a background thread of the master
+    cache = GetSnapshotCache(n_limit)
+    refresh_on_read, cache.refresh_on_read = cache.refresh_on_read, False
+    try:
+        PrebuildTabContents(n_limit)
+    except FetchError:
+        logger.exception("No hawker data to warm up with, the workers will fetch it")
+    finally:
+        cache.refresh_on_read = refresh_on_read
+
+def StartBackgroundRefresh():
+    """
+    Function:   Refresh the data in the background and pre-build the map and table of each new snapshot.
+                Threads do not survive a fork, so gunicorn calls this in every worker after forking.
+    """
+    StartRefreshScheduler(on_refresh = PrebuildTabContents)
+
+# The layout does not depend on the data, so it is built once and served as is
+app.layout = update_layout()
 
 
 if __name__ == "__main__":
-    app.run_server(debug=True, host = "0.0.0.0", port=80, use_reloader=True)
+    # Development server. In production the app is served by gunicorn, see gunicorn.conf.py
+    StartBackgroundRefresh()
+    app.run(debug = config.DEBUG, host = config.HOST, port = config.PORT, use_reloader = config.DEBUG)
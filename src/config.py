@@ -0,0 +1,73 @@
+import os
+from zoneinfo import ZoneInfo
+
+# Timezone of the closure dates and of the "Accurate as of" time
+TIMEZONE = ZoneInfo("Asia/Singapore")
+
+# Seconds before a cached hawker snapshot is considered stale and refreshed in the background
+CACHE_TTL = float(os.environ.get("HAWKER_CACHE_TTL", 15 * 60))
+
+# data.gov.sg datastore_search endpoint and the hawker centre closure dataset
+API_URL = os.environ.get("HAWKER_API_URL", "https://data.gov.sg/api/action/datastore_search")
+RESOURCE_ID = os.environ.get("HAWKER_RESOURCE_ID", "b80cb643-a732-480d-86b5-e03957bc82aa")
+
+# Paginated fetch settings. FETCH_BUDGET caps the seconds of one whole fetch, including retries.
+FETCH_WORKERS = int(os.environ.get("HAWKER_FETCH_WORKERS", 4))
+PAGE_TIMEOUT = float(os.environ.get("HAWKER_PAGE_TIMEOUT", 5))
+FETCH_RETRIES = int(os.environ.get("HAWKER_FETCH_RETRIES", 3))
+RETRY_BACKOFF = float(os.environ.get("HAWKER_RETRY_BACKOFF", 0.5))
+FETCH_BUDGET = float(os.environ.get("HAWKER_FETCH_BUDGET", 20))
+
+# Datasets ingested into the unified centre model, see hawker_datasets.py. HAWKER_DATASET_SPECS may point to a 
+# JSON file with the specs of further datasets.
+DATASETS = [name.strip() for name in os.environ.get("HAWKER_DATASETS", "hawker_centres").split(",") if name.strip()]
+DATASET_SPECS_FILE = os.environ.get("HAWKER_DATASET_SPECS", "")
+
+# Stop calling data.gov.sg after BREAKER_FAILURES failed fetches in a row, and try again after BREAKER_RESET seconds
+BREAKER_FAILURES = int(os.environ.get("HAWKER_BREAKER_FAILURES", 3))
+BREAKER_RESET = float(os.environ.get("HAWKER_BREAKER_RESET", 5 * 60))
+
+# Number of rendered folium maps kept in memory, one per data version
+MAP_CACHE_SIZE = int(os.environ.get("HAWKER_MAP_CACHE_SIZE", 8))
+
+# "geojson" draws all hawker centres as one GeoJSON layer, "markers" adds one CircleMarker per centre
+MAP_MARKER_MODE = os.environ.get("HAWKER_MAP_MARKER_MODE", "geojson")
+
+# Rows per page of the hawker data table, the table is paged, filtered and sorted on the server
+TABLE_PAGE_SIZE = int(os.environ.get("HAWKER_TABLE_PAGE_SIZE", 20))
+
+# Seconds between the polls of an open dashboard for changes to the data, 0 to disable. A change is applied to the
+# map markers and table rows in place. CHANGE_FEED_SIZE data versions are kept to compute the changes from.
+CHANGE_POLL_INTERVAL = float(os.environ.get("HAWKER_CHANGE_POLL_INTERVAL", 60))
+CHANGE_FEED_SIZE = int(os.environ.get("HAWKER_CHANGE_FEED_SIZE", 16))
+
+# Number of nearest open hawker centres returned by default and at most, see /api/nearest
+NEAREST_K = int(os.environ.get("HAWKER_NEAREST_K", 5))
+NEAREST_MAX_K = int(os.environ.get("HAWKER_NEAREST_MAX_K", 20))
+
+# Directory of the persisted snapshot shared by all worker processes, empty to disable
+SNAPSHOT_DIR = os.environ.get("HAWKER_SNAPSHOT_DIR", os.path.join(os.getcwd(), "hawker-snapshot"))
+
+# Seconds after which the data is shown as out of date, when data.gov.sg could not be reached for a while
+STALE_AFTER = float(os.environ.get("HAWKER_STALE_AFTER", 2 * CACHE_TTL))
+
+# Seconds between scheduled refreshes, each randomly shifted by up to REFRESH_JITTER of the interval.
+# 0 disables the scheduler and the data is refreshed when a stale snapshot is read instead.
+REFRESH_INTERVAL = float(os.environ.get("HAWKER_REFRESH_INTERVAL", CACHE_TTL))
+REFRESH_JITTER = float(os.environ.get("HAWKER_REFRESH_JITTER", 0.1))
+
+# Allow per-request cProfile dumps with the ?profile=1 query flag, written to PROFILE_DIR
+PROFILING_ENABLED = os.environ.get("HAWKER_PROFILING", "0") == "1"
+PROFILE_DIR = os.environ.get("HAWKER_PROFILE_DIR", os.path.join(os.getcwd(), "hawker-profiles"))
+
+# Run the Dash debugger and reloader, only for local development
+DEBUG = os.environ.get("HAWKER_DEBUG", "0") == "1"
+
+# Address and worker processes of the web server, see gunicorn.conf.py
+HOST = os.environ.get("HAWKER_HOST", "0.0.0.0")
+PORT = int(os.environ.get("HAWKER_PORT", 80))
+WEB_WORKERS = int(os.environ.get("HAWKER_WEB_WORKERS", 2 * (os.cpu_count() or 1) + 1))
+WEB_THREADS = int(os.environ.get("HAWKER_WEB_THREADS", 4))
+
+# Seconds browsers may cache fingerprinted Dash bundles and the files in /assets
+STATIC_MAX_AGE = int(os.environ.get("HAWKER_STATIC_MAX_AGE", 365 * 24 * 60 * 60))
@@ -1,55 +1,312 @@
 import dash_bootstrap_components as dbc
-import pandas as pd 
-from dash import html
+import hashlib
+import logging
+import math
+import re
 from datetime import datetime
-from hawker_data import GetHawkerData
-from hawker_visualization import GetHCFigures
+import pandas as pd 
+from dash import html, dcc, callback, clientside_callback, no_update, Input, Output, Patch, State
+from dash.exceptions import PreventUpdate
+from hawker_cache import GetHawkerSnapshot, LRUCache
+from hawker_changes import ChangeFeed, CreateCentreView
+from hawker_fetch import FetchError
+from hawker_index import GetNearestOpenCentres
+from hawker_calendar import GetAvailabilityMatrix, PERIODS
+from hawker_visualization import CreateFeatureCollection, GetHCFigures
+from hawker_status import GetCutOffDates
+from info import info_tab
 from dash import dash_table
-import pytz 
+import config
+from hawker_metrics import TimedStage, change_messages
+
+logger = logging.getLogger(__name__)
+
+def FormatAge(seconds):
+    """
+    Function:   Age as a rounded number of minutes, hours or days
+    """
+    for unit, unit_seconds in [("day", 86400), ("hour", 3600), ("minute", 60)]:
+        if seconds >= unit_seconds or unit == "minute":
+            count = int(seconds // unit_seconds)
+            return f"{count} {unit}{'' if count == 1 else 's'}"
+
+def GetStaleAge(snapshot):
+    """
+    Function:   Rounded age of the snapshot once it is older than config.STALE_AFTER, that is when refreshes have 
+                been failing and the last good snapshot is served. None while the data is up to date.
+    """
+    age = snapshot.Age()
+    return FormatAge(age) if age >= config.STALE_AFTER else None
 
-def CreateHCMapTab():
+def CreateAccurateAsOf(fetched_at, stale_age = None):
     """
-    Function:   Create the HC Map Tab using the figure filename
+    Function:   Fetch time of the shown data, with a notice once the data is stale
+    """
+    accurate_as_of = [f"Accurate as of: {fetched_at.astimezone(config.TIMEZONE).strftime('%d %b %Y %H:%M:%S')}"]
+    if stale_age is not None:
+        accurate_as_of.append(html.Span(f" (not updated for {stale_age}, data.gov.sg may be unavailable)", 
+                                        style = {"color": "#ed2e38"}))
+    return accurate_as_of
+
+@TimedStage("create_hc_map_tab")
+def CreateHCMapTab(map_version, fetched_at, stale_age = None, view_version = None):
+    """
+    Function:   Create the HC Map Tab using the map version served by the /hawker-map route. The view version 
+                is the version of the change feed the map shows, which PATCH_MAP_JS patches it from.
     """
     HCMapTab = dbc.Card(
         [
             dbc.CardBody(
                 [
-                    html.P(f"Accurate as of: {datetime.now(pytz.timezone('Asia/Singapore')).strftime('%d %b %Y %H:%M:%S')}"),
+                    dcc.Store(id = "hawker-map-view", data = view_version),
+                    html.P(CreateAccurateAsOf(fetched_at, stale_age), id = "hawker-map-accurate-as-of"),
                     html.Iframe(
                         id = "hawker-map",
-                        srcDoc = open("hawker-centres.html", "r").read(),
+                        src = f"/hawker-map/{map_version}.html",
                         width = "100%",
                         height = "500",
                     ),
                     html.Br(),
+                    CreateNearMePanel(),
                 ]
             )
         ]
     )
     return HCMapTab
 
-def CreateDataTable(hawker_df, hawker_centre_df, columns_params_dict_list = None):
+def CreateNearMePanel():
+    """
+    Function:   Panel listing the open hawker centres nearest to the visitor's location on the chosen date
+    """
+    date_today, _ = GetCutOffDates()
+    return html.Div(
+        [
+            dbc.Row(
+                [
+                    dbc.Col(dbc.Button("Find open hawker centres near me", id = "near-me-button", color = "danger", size = "sm"), 
+                            width = "auto"),
+                    dbc.Col(dcc.DatePickerSingle(id = "near-me-date", date = date_today.date(), display_format = "DD MMM YYYY"), 
+                            width = "auto"),
+                ],
+                align = "center",
+            ),
+            dcc.Store(id = "near-me-location"),
+            dcc.Loading(html.Div(id = "near-me-results", className = "mt-2")),
+        ]
+    )
+
+# Ask the browser for the visitor's location, the callback waits for the returned promise
+GEOLOCATE_JS = """
+function(n_clicks) {
+    if (!n_clicks) {
+        return window.dash_clientside.no_update;
+    }
+    return new Promise(function(resolve) {
+        if (!navigator.geolocation) {
+            resolve({error: "Your browser does not share its location."});
+            return;
+        }
+        navigator.geolocation.getCurrentPosition(
+            function(position) {
+                resolve({latitude: position.coords.latitude, longitude: position.coords.longitude});
+            },
+            function(error) {
+                resolve({error: "Your location is not available: " + error.message});
+            },
+            {timeout: 10000, maximumAge: 60000}
+        );
+    });
+}
+"""
+
+clientside_callback(
+    GEOLOCATE_JS,
+    Output("near-me-location", "data"),
+    Input("near-me-button", "n_clicks"),
+    prevent_initial_call = True,
+)
+
+def CreateNearMeTable(centres):
+    """
+    Function:   Table of the nearest open hawker centres returned by GetNearestOpenCentres
+    """
+    near_me_df = pd.DataFrame(centres, columns = ["clean_name", "address_myenv", "distance_km", "status", "closure_start", "closure_end"])
+    near_me_df["next_closure"] = [f"{start} to {end}" if start else "" for start, end in zip(near_me_df["closure_start"], near_me_df["closure_end"])]
+    near_me_df = near_me_df[["clean_name", "address_myenv", "distance_km", "status", "next_closure"]].rename(columns = {
+        "clean_name": "Hawker Name", "address_myenv": "Hawker Address", "distance_km": "Distance (km)",
+        "status": "Current Status", "next_closure": "Closure Dates"})
+    return dbc.Table.from_dataframe(near_me_df, striped = True, bordered = True, hover = True, size = "sm")
+
+@callback(
+    Output("near-me-results", "children"),
+    Input("near-me-location", "data"),
+    Input("near-me-date", "date"),
+    prevent_initial_call = True,
+)
+def UpdateNearMe(location, date):
+    """
+    Function:   List the open hawker centres nearest to the visitor's location on the chosen date
+    """
+    if not location:
+        raise PreventUpdate
+    if "error" in location:
+        return dbc.Alert(location["error"], color = "warning")
+
+    date_today, _ = GetCutOffDates()
+    as_of = None if date is None or pd.Timestamp(date) == pd.Timestamp(date_today.date()) else pd.Timestamp(date).to_pydatetime()
+    try:
+        centres = GetNearestOpenCentres(location["latitude"], location["longitude"], as_of)
+    except FetchError:
+        return dbc.Alert("The hawker centre data could not be loaded from data.gov.sg. Please try again later.", color = "warning")
+    if not centres:
+        return dbc.Alert("No hawker centre is open on this date.", color = "warning")
+    return CreateNearMeTable(centres)
 
+# Operators of a DataTable filter query by their names and symbols
+FILTER_OPERATORS = {"ge": "ge", ">=": "ge", "le": "le", "<=": "le", "lt": "lt", "<": "lt", "gt": "gt", ">": "gt",
+                    "ne": "ne", "!=": "ne", "eq": "eq", "=": "eq", "contains": "contains", "datestartswith": "datestartswith"}
+FILTER_PART_PATTERN = re.compile(r"^\{(.+?)\}\s*(\S+)\s+(.*)$")
+NUMERIC_COLS = ["No of Market Stalls", "No of Food Stalls"]
+DATETIME_COLS = ["Closure Start Date", "Closure End Date"]
+
+hawker_table_cache = LRUCache(config.MAP_CACHE_SIZE, "table")
+
+@TimedStage("prepare_table_data")
+def PrepareTableData(hawker_df, hawker_centre_df):
+    """
+    Function:   Create the table dataframe and its column definitions. Numeric columns are converted to numbers 
+                and dates to ISO strings so that server-side sorting and filtering compare them correctly.
+    """
     hawker_df, rename_cols_dict = CleanUpHawkerDataFrame(hawker_df, hawker_centre_df)
-    numeric_cols = ["No of Market Stalls", "No of Food Stalls"]
-    datetime_cols = ["Closure Start Date", "Closure End Date"]
-    
+
     columns_params_dict_list = []
     for val in rename_cols_dict.values():
         data_type = "text"
-        if val in numeric_cols:
-            data_type == "numeric"
-        elif val in datetime_cols:
+        if val in NUMERIC_COLS:
+            data_type = "numeric"
+            hawker_df[val] = pd.to_numeric(hawker_df[val], errors = "coerce")
+        elif val in DATETIME_COLS:
             data_type = "datetime"
+            hawker_df[val] = hawker_df[val].astype(str)
 
         columns_params_dict_list.append({"name":val, "id":val, "type":data_type})
 
+    hawker_df.reset_index(drop = True, inplace = True)
+    return hawker_df, columns_params_dict_list
+
+def CacheTableData(hawker_df, hawker_centre_df):
+    """
+    Function:   Store the table dataframe in the table cache, keyed by a hash of its content
+    """
+    table_df, columns_params_dict_list = PrepareTableData(hawker_df, hawker_centre_df)
+    table_version = hashlib.sha1(pd.util.hash_pandas_object(table_df, index = False).values.tobytes()).hexdigest()[:16]
+    if hawker_table_cache.Get(table_version) is None:
+        hawker_table_cache.Put(table_version, (table_df, columns_params_dict_list))
+    return table_version
+
+def SplitFilterPart(filter_part):
+    """
+    Function:   Split one part of a filter query such as '{No of Food Stalls} > 10' into (column, operator, value).
+                The operator is the token right after the column, so operator words within the value are kept.
+    """
+    match = FILTER_PART_PATTERN.match(filter_part.strip())
+    if match is None:
+        return [None] * 3
+    name, operator, value_part = match.groups()
+
+    # The case sensitive (s) and insensitive (i) variants of an operator, such as 'scontains' or 'i=', filter alike
+    if operator not in FILTER_OPERATORS and operator[:1] in ("s", "i"):
+        operator = operator[1:]
+    if operator not in FILTER_OPERATORS:
+        return [None] * 3
+
+    value_part = value_part.strip()
+    v0 = value_part[0] if value_part else ""
+    if v0 == value_part[-1:] and v0 in ("'", '"', "`"):
+        value = value_part[1: -1].replace("\\" + v0, v0)
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+    return name, FILTER_OPERATORS[operator], value
+
+def FilterTableData(table_df, filter_query):
+    """
+    Function:   Apply a DataTable filter query, parts joined by ' && ' are all applied
+    """
+    for filter_part in (filter_query or "").split(" && "):
+        col_name, operator, filter_value = SplitFilterPart(filter_part)
+        if col_name not in table_df.columns:
+            continue
+
+        column = table_df[col_name]
+        if col_name in NUMERIC_COLS and operator not in ("contains", "datestartswith"):
+            filter_value = pd.to_numeric(filter_value, errors = "coerce")
+        else:
+            column = column.astype(str)
+            filter_value = str(filter_value)
+
+        if operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+            table_df = table_df.loc[getattr(column, operator)(filter_value)]
+        elif operator == "contains":
+            table_df = table_df.loc[column.str.contains(filter_value, case = False, regex = False)]
+        elif operator == "datestartswith":
+            table_df = table_df.loc[column.str.startswith(filter_value)]
+    return table_df
+
+def SortTableData(table_df, sort_by):
+    """
+    Function:   Sort by the DataTable sort_by list of {"column_id", "direction"}
+    """
+    sort_by = [col for col in (sort_by or []) if col["column_id"] in table_df.columns]
+    if not sort_by:
+        return table_df
+    return table_df.sort_values(
+        [col["column_id"] for col in sort_by],
+        ascending = [col["direction"] == "asc" for col in sort_by],
+        kind = "stable",
+    )
+
+@TimedStage("get_table_page")
+def GetTablePage(table_df, page_current, page_size, sort_by = None, filter_query = None):
+    """
+    Function:   Filter, sort and slice the table dataframe. Returns the page records and the page count.
+    """
+    table_df = SortTableData(FilterTableData(table_df, filter_query), sort_by)
+    page_count = max(math.ceil(len(table_df) / page_size), 1)
+    page_df = table_df.iloc[page_current * page_size: (page_current + 1) * page_size]
+    return page_df.to_dict('records'), page_count
+
+def GetTableData(table_version):
+    """
+    Function:   Get the table dataframe of the version shown to the user. If this worker does not have that 
+                version, the current table is served instead.
+    """
+    table_data = hawker_table_cache.Get(table_version)
+    if table_data is None:
+        hawker_df, hawker_centre_df, _, _ = CombineHawkerData()
+        table_data = hawker_table_cache.Get(CacheTableData(hawker_df, hawker_centre_df))
+    return table_data
+
+@TimedStage("create_data_table")
+def CreateDataTable(table_version, page_size = config.TABLE_PAGE_SIZE):
+    table_df, columns_params_dict_list = GetTableData(table_version)
+    data, page_count = GetTablePage(table_df, 0, page_size)
+
     table = dash_table.DataTable(
+        id = "hawker-table",
         columns = columns_params_dict_list,
-        data = hawker_df.to_dict('records'),
-        filter_action = 'native',
-        sort_action="native",
+        data = data,
+        page_current = 0,
+        page_size = page_size,
+        page_count = page_count,
+        page_action = "custom",
+        filter_action = "custom",
+        filter_query = "",
+        sort_action = "custom",
+        sort_mode = "multi",
+        sort_by = [],
         style_data = {
             'textOverflow': 'ellipsis',
         },
@@ -66,7 +323,24 @@ def CreateDataTable(hawker_df, hawker_centre_df, columns_params_dict_list = None
         ],
     )
 
-    return table
+    return html.Div([dcc.Store(id = "hawker-table-version", data = table_version), table])
+
+@callback(
+    Output("hawker-table", "data"),
+    Output("hawker-table", "page_count"),
+    Input("hawker-table", "page_current"),
+    Input("hawker-table", "page_size"),
+    Input("hawker-table", "sort_by"),
+    Input("hawker-table", "filter_query"),
+    State("hawker-table-version", "data"),
+    prevent_initial_call = True,
+)
+def UpdateHawkerTable(page_current, page_size, sort_by, filter_query, table_version):
+    """
+    Function:   Serve one page of the hawker table from the cached table dataframe
+    """
+    table_df, _ = GetTableData(table_version)
+    return GetTablePage(table_df, page_current or 0, page_size or config.TABLE_PAGE_SIZE, sort_by, filter_query)
 
 
 def CreateTableTab(hawker_df, hawker_centre_df):
@@ -116,24 +390,306 @@ def CleanUpHawkerDataFrame(hawker_df, hawker_centre_df):
     return hawker_df, rename_cols_dict
 
 
-def CreateDashboardTabs(n_limit = 200):
+@TimedStage("combine_hawker_data")
+def CombineHawkerData(n_limit = 200):
     """
-    Function:   Create the necessary tabs for the dashboard
+    Function:   Combine the 3 hawker status dfs into one df for the data table
     """
-    hawker_centre_df, cleaning_dates_df, remarks_df = GetHawkerData()
-    open_hawkers_df, closing_1month_df, currently_closed_df = GetHCFigures(n_limit)
+    snapshot = GetHawkerSnapshot(n_limit)
+    open_hawkers_df, closing_1month_df, currently_closed_df, map_version = GetHCFigures(n_limit)
 
     # Combine the 3 hawker dfs
     hawker_df = pd.concat([open_hawkers_df, closing_1month_df, currently_closed_df])
     hawker_df.sort_values("clean_name", inplace = True)
+    return hawker_df, snapshot.hawker_centre_df, map_version, snapshot.fetched_at
+
+def CreateCalendarFigure(aggregate_df):
+    """
+    Function:   Line chart of the open stalls and centres over time
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    figure = make_subplots(specs = [[{"secondary_y": True}]])
+    figure.add_trace(go.Scatter(x = aggregate_df.index, y = aggregate_df["open_food_stalls"], name = "Open food stalls"))
+    figure.add_trace(go.Scatter(x = aggregate_df.index, y = aggregate_df["open_market_stalls"], name = "Open market stalls"))
+    figure.add_trace(go.Scatter(x = aggregate_df.index, y = aggregate_df["open_centres"], name = "Open hawker centres",
+                                line = {"dash": "dot"}), secondary_y = True)
+    figure.update_yaxes(title_text = "Stalls", secondary_y = False)
+    figure.update_yaxes(title_text = "Hawker centres", secondary_y = True)
+    figure.update_layout(margin = {"l": 40, "r": 40, "t": 30, "b": 30}, legend = {"orientation": "h"}, hovermode = "x unified")
+    return figure
+
+@TimedStage("create_calendar_tab")
+def CreateCalendarTab(calendar):
+    """
+    Function:   Create the closure calendar tab with the daily availability of the current year
+    """
+    date_today, _ = GetCutOffDates()
+    start_date = max(pd.Timestamp(date_today.year, 1, 1), calendar.days[0])
+    end_date = min(pd.Timestamp(date_today.year, 12, 31), calendar.days[-1])
+
+    CalendarTab = dbc.Card(
+        [
+            dbc.CardBody(
+                [
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                dcc.DatePickerRange(
+                                    id = "calendar-range",
+                                    min_date_allowed = calendar.days[0].date(),
+                                    max_date_allowed = calendar.days[-1].date(),
+                                    start_date = start_date.date(),
+                                    end_date = end_date.date(),
+                                    display_format = "DD MMM YYYY",
+                                ),
+                                width = "auto",
+                            ),
+                            dbc.Col(
+                                dbc.RadioItems(
+                                    id = "calendar-period",
+                                    options = [{"label": period.capitalize(), "value": period} for period in PERIODS],
+                                    value = "day",
+                                    inline = True,
+                                ),
+                                width = "auto",
+                            ),
+                        ],
+                        align = "center",
+                    ),
+                    dcc.Graph(id = "calendar-graph", figure = CreateCalendarFigure(calendar.Aggregate(start_date, end_date))),
+                ]
+            )
+        ]
+    )
+    return CalendarTab
+
+@callback(
+    Output("calendar-graph", "figure"),
+    Input("calendar-range", "start_date"),
+    Input("calendar-range", "end_date"),
+    Input("calendar-period", "value"),
+    prevent_initial_call = True,
+)
+def UpdateCalendarGraph(start_date, end_date, period):
+    """
+    Function:   Redraw the closure calendar for the selected date range and period
+    """
+    return CreateCalendarFigure(GetAvailabilityMatrix().Aggregate(start_date, end_date, period or "day"))
+
+# Ids of the dashboard tabs. The body of the active tab is rendered by RenderTabContent
+MAP_TAB, TABLE_TAB, CALENDAR_TAB, INFO_TAB = "tab-map", "tab-table", "tab-calendar", "tab-info"
+
+hawker_tab_cache = LRUCache(config.MAP_CACHE_SIZE * 3, "tab")
+change_feed = ChangeFeed()
 
-    # Create tabs
-    hc_map_tab = CreateHCMapTab()
-    hawker_table_tab = CreateDataTable(hawker_df, hawker_centre_df)
+def GetDataVersion(n_limit = 200):
+    """
+    Function:   Version of the data shown in the tabs. It changes with every new snapshot and every day, 
+                as the status of each hawker centre depends on today's date, and with the shown age of stale data.
+    """
+    snapshot = GetHawkerSnapshot(n_limit)
+    date_today, _ = GetCutOffDates()
+    return snapshot.version, snapshot.fetched_at, date_today.date(), GetStaleAge(snapshot)
+
+def GetViewState(n_limit = 200):
+    """
+    Function:   What the tabs show of the current data version: the version of its centre view in the change feed, 
+                the map and table versions, and the fetch time and staleness. Built once per data version.
+    """
+    data_version = GetDataVersion(n_limit)
+    cache_key = ("view", n_limit, *data_version)
+    view_state = hawker_tab_cache.Get(cache_key)
+    if view_state is None:
+        hawker_df, hawker_centre_df, map_version, fetched_at = CombineHawkerData(n_limit)
+        view_state = {
+            "version": change_feed.Publish(CreateCentreView(hawker_df, hawker_centre_df)),
+            "map_version": map_version,
+            "table_version": CacheTableData(hawker_df, hawker_centre_df),
+            "fetched_at": fetched_at.isoformat(),
+            "stale_age": data_version[-1],
+        }
+        hawker_tab_cache.Put(cache_key, view_state)
+    return view_state
+
+@TimedStage("create_tab_content")
+def CreateTabContent(tab_id, n_limit = 200):
+    """
+    Function:   Create the body of one tab. The map, table and calendar are only built when their tab is first 
+                requested for a data version, later requests are served from the tab cache.
+    """
+    if tab_id not in (MAP_TAB, TABLE_TAB, CALENDAR_TAB):
+        return info_tab
 
-    return hc_map_tab, hawker_table_tab
+    cache_key = (tab_id, n_limit, *GetDataVersion(n_limit))
+    tab_content = hawker_tab_cache.Get(cache_key)
+    if tab_content is not None:
+        return tab_content
 
+    if tab_id == MAP_TAB:
+        view_state = GetViewState(n_limit)
+        tab_content = CreateHCMapTab(view_state["map_version"], datetime.fromisoformat(view_state["fetched_at"]), 
+                                     view_state["stale_age"], view_state["version"])
+    elif tab_id == CALENDAR_TAB:
+        tab_content = CreateCalendarTab(GetAvailabilityMatrix(n_limit))
+    else:
+        tab_content = CreateDataTable(GetViewState(n_limit)["table_version"])
 
+    hawker_tab_cache.Put(cache_key, tab_content)
+    return tab_content
 
+@callback(
+    Output("hawker-tab-content", "children"),
+    Output("hawker-view-state", "data"),
+    Input("hawker-tabs", "active_tab"),
+)
+def RenderTabContent(active_tab):
+    """
+    Function:   Render the body of the selected tab and remember the view state it shows, which PollChanges 
+                sends the changes from. Without any snapshot, in memory or on disk, and with data.gov.sg 
+                unavailable, a notice is shown instead.
+    """
+    active_tab = active_tab or MAP_TAB
+    try:
+        tab_content = CreateTabContent(active_tab)
+        return tab_content, GetViewState() if active_tab != INFO_TAB else no_update
+    except FetchError:
+        logger.exception("No hawker data to render the %s tab", active_tab)
+        return dbc.Alert("The hawker centre data could not be loaded from data.gov.sg. Please try again later.", 
+                         color = "warning", className = "m-3"), no_update
 
+def CreateChangeMessage(view_state, current_state):
+    """
+    Function:   Changes from the view state shown on the page to the current one: the names of the added, removed
+                and updated centres and the map features of the added and updated ones. If this worker does not 
+                know the shown version, the message is a reset and the tabs reload their map and table instead.
+    """
+    changes = change_feed.Changes(view_state["version"], current_state["version"])
+    view = change_feed.View(current_state["version"])
+    message = dict(current_state, previous_version = view_state["version"], reset = changes is None or view is None)
+    if message["reset"]:
+        change_messages.Inc(kind = "reset")
+        return message
+
+    changed_df = view.loc[changes["added"] + changes["updated"]].reset_index()
+    message.update(changes, features = CreateFeatureCollection(changed_df)["features"])
+    change_messages.Inc(kind = "changes")
+    return message
 
+@callback(
+    Output("hawker-changes", "data"),
+    Output("hawker-view-state", "data", allow_duplicate = True),
+    Input("hawker-changes-interval", "n_intervals"),
+    State("hawker-view-state", "data"),
+    prevent_initial_call = True,
+)
+def PollChanges(n_intervals, view_state):
+    """
+    Function:   Publish the changes since the view state shown on the page, the poll is answered with an empty
+                response while nothing changed
+    """
+    try:
+        current_state = GetViewState()
+    except FetchError:
+        raise PreventUpdate
+    if view_state is None or view_state == current_state:
+        raise PreventUpdate
+    return CreateChangeMessage(view_state, current_state), current_state
+
+def HasChanges(message):
+    return message["reset"] or any(message[key] for key in ("added", "removed", "updated"))
+
+# Patch the GeoJSON layer of the map in the iframe: the markers of the removed and updated centres are removed
+# and the features of the added and updated ones added. The map is reloaded instead if it does not show the version
+# the changes start from, or has no GeoJSON layer as in the "markers" mode.
+PATCH_MAP_JS = """
+function(message, map_view) {
+    var frame = document.getElementById("hawker-map");
+    if (!message || !frame) {
+        return window.dash_clientside.no_update;
+    }
+    var layer = null;
+    if (!message.reset && message.previous_version === map_view) {
+        try {
+            var map_window = frame.contentWindow;
+            for (var name in map_window) {
+                if (name.indexOf("geo_json_") === 0 && map_window[name] instanceof map_window.L.GeoJSON) {
+                    layer = map_window[name];
+                    break;
+                }
+            }
+        } catch (error) {
+            layer = null;
+        }
+    }
+    if (layer === null) {
+        frame.src = "/hawker-map/" + message.map_version + ".html";
+        return message.version;
+    }
+    var changed = new Set(message.removed.concat(message.updated));
+    layer.eachLayer(function(marker) {
+        if (changed.has(marker.feature.properties.clean_name)) {
+            layer.removeLayer(marker);
+        }
+    });
+    layer.addData(message.features);
+    return message.version;
+}
+"""
+
+clientside_callback(
+    PATCH_MAP_JS,
+    Output("hawker-map-view", "data"),
+    Input("hawker-changes", "data"),
+    State("hawker-map-view", "data"),
+    prevent_initial_call = True,
+)
+
+@callback(
+    Output("hawker-map-accurate-as-of", "children"),
+    Input("hawker-changes", "data"),
+    prevent_initial_call = True,
+)
+def UpdateAccurateAsOf(message):
+    return CreateAccurateAsOf(datetime.fromisoformat(message["fetched_at"]), message["stale_age"])
+
+@callback(
+    Output("hawker-table", "data", allow_duplicate = True),
+    Output("hawker-table", "page_count", allow_duplicate = True),
+    Output("hawker-table-version", "data"),
+    Input("hawker-changes", "data"),
+    State("hawker-table", "data"),
+    State("hawker-table", "page_current"),
+    State("hawker-table", "page_size"),
+    State("hawker-table", "sort_by"),
+    State("hawker-table", "filter_query"),
+    prevent_initial_call = True,
+)
+def PatchHawkerTable(message, page_data, page_current, page_size, sort_by, filter_query):
+    """
+    Function:   Apply a change message to the shown page of the table. While the page lists the same centres, 
+                only the rows of the updated centres are sent, otherwise the whole page.
+    """
+    if not HasChanges(message):
+        raise PreventUpdate
+    table_version = message["table_version"]
+    table_df, _ = GetTableData(table_version)
+    data, page_count = GetTablePage(table_df, page_current or 0, page_size or config.TABLE_PAGE_SIZE, sort_by, filter_query)
+    if message["reset"] or [row["Hawker Name"] for row in page_data or []] != [row["Hawker Name"] for row in data]:
+        return data, page_count, table_version
+
+    updated = set(message["updated"])
+    page_patch = Patch()
+    for position, row in enumerate(data):
+        if row["Hawker Name"] in updated:
+            page_patch[position] = row
+    return page_patch, page_count, table_version
+
+@TimedStage("prebuild_tab_contents")
+def PrebuildTabContents(n_limit = 200):
+    """
+    Function:   Build the map, table and calendar of the current data version ahead of the first visitor
+    """
+    for tab_id in (MAP_TAB, TABLE_TAB, CALENDAR_TAB):
+        CreateTabContent(tab_id, n_limit)
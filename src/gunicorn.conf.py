@@ -0,0 +1,21 @@
+# gunicorn reads every name in this file as a setting, and "config" is one of them
+import config as hawker_config
+
+bind = f"{hawker_config.HOST}:{hawker_config.PORT}"
+workers = hawker_config.WEB_WORKERS
+threads = hawker_config.WEB_THREADS
+worker_class = "gthread"
+
+# Load the app and the hawker data once in the master, the workers share it copy-on-write
+preload_app = True
+
+# Building the map of a new snapshot may take a while on the first request
+timeout = 120
+keepalive = 5
+
+accesslog = "-"
+
+def post_fork(server, worker):
+    # The refresh scheduler thread does not survive the fork, every worker starts its own
+    from app import StartBackgroundRefresh
+    StartBackgroundRefresh()
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import config
+from hawker_datasets import GetDatasetSpecs
+from hawker_incremental import IncrementalPipeline, IngestDatasets
+from hawker_metrics import TimedStage, CountCacheRequest
+from hawker_snapshot import LoadSnapshotFrames, WriteSnapshot
+
+logger = logging.getLogger(__name__)
+
+class HawkerSnapshot:
+    """
+    Class:  One processed copy of the hawker data together with the time it was fetched.
+            The version is the hash of the raw payload, so it only changes when the data changes.
+            The dataframes are shared between requests and must not be modified in place.
+    """
+    def __init__(self, hawker_centre_df, cleaning_dates_df, remarks_df, version, fetched_at = None):
+        self.hawker_centre_df = hawker_centre_df
+        self.cleaning_dates_df = cleaning_dates_df
+        self.remarks_df = remarks_df
+        self.version = version
+        self.fetched_at = fetched_at or datetime.now(config.TIMEZONE)
+        self.loaded_at = time.monotonic()
+
+    def Age(self):
+        """
+        Function:   Seconds since the data was fetched from data.gov.sg
+        """
+        return (datetime.now(config.TIMEZONE) - self.fetched_at).total_seconds()
+
+    def Frames(self):
+        """
+        Function:   Return copies of the 3 dataframes so that callers may modify them freely
+        """
+        return self.hawker_centre_df.copy(), self.cleaning_dates_df.copy(), self.remarks_df.copy()
+
+class SnapshotCache:
+    """
+    Class:  Process-wide cache in front of a snapshot loader.
+            Only one thread refreshes at a time. Once a snapshot exists, callers are always served
+            from memory and a stale snapshot is refreshed in a background thread.
+            While there is no snapshot, the persisted_loader, if given, is tried before the loader, so a process
+            that cannot reach data.gov.sg still serves the last good snapshot on disk.
+            When refreshes are scheduled elsewhere, set refresh_on_read to False and Swap in new snapshots.
+    """
+    def __init__(self, loader, ttl = config.CACHE_TTL, persisted_loader = None):
+        self._loader = loader
+        self._ttl = ttl
+        self._persisted_loader = persisted_loader
+        self._snapshot = None
+        self._refreshing = False
+        self.refresh_on_read = True
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def IsStale(self, snapshot):
+        return snapshot.Age() >= self._ttl
+
+    def Get(self):
+        """
+        Function:   Return the current snapshot. Blocks only when there is no snapshot at all yet.
+        """
+        snapshot = self._snapshot
+        CountCacheRequest("snapshot", snapshot is not None)
+        if snapshot is None:
+            snapshot = self._LoadPersisted() or self.Refresh()
+        if self.refresh_on_read and self.IsStale(snapshot):
+            self.RefreshInBackground()
+        return snapshot
+
+    def Peek(self):
+        """
+        Function:   Return the current snapshot, or None, without loading anything
+        """
+        return self._snapshot
+
+    def Swap(self, snapshot):
+        """
+        Function:   Replace the current snapshot with one loaded elsewhere
+        """
+        with self._refresh_lock:
+            self._snapshot = snapshot
+
+    def Refresh(self):
+        """
+        Function:   Load a new snapshot in the calling thread. Concurrent callers wait for the 
+                    refresh in progress instead of starting their own.
+        """
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.loaded_at >= requested_at:
+                return snapshot
+
+            snapshot = self._loader()
+            self._snapshot = snapshot
+            return snapshot
+
+    def _LoadPersisted(self):
+        with self._refresh_lock:
+            if self._snapshot is not None or self._persisted_loader is None:
+                return self._snapshot
+            try:
+                self._snapshot = self._persisted_loader()
+            except Exception:
+                logger.exception("Loading the persisted snapshot failed")
+            return self._snapshot
+
+    def RefreshInBackground(self):
+        """
+        Function:   Start a background refresh unless one is already running
+        """
+        with self._state_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+
+        thread = threading.Thread(target = self._BackgroundRefresh, name = "hawker-refresh", daemon = True)
+        thread.start()
+        return True
+
+    def _BackgroundRefresh(self):
+        try:
+            self.Refresh()
+        except Exception:
+            logger.exception("Background refresh of hawker data failed, serving the stale snapshot")
+        finally:
+            with self._state_lock:
+                self._refreshing = False
+
+@TimedStage("load_hawker_snapshot")
+def LoadHawkerSnapshot(pipelines, n_limit = 200):
+    """
+    Function:   Fetch the raw records of every dataset and run them through their incremental pipelines
+    """
+    hawker_centre_df, cleaning_dates_df, remarks_df, version = IngestDatasets(pipelines, n_limit)
+    snapshot = HawkerSnapshot(hawker_centre_df, cleaning_dates_df, remarks_df, version)
+    if config.SNAPSHOT_DIR:
+        try:
+            WriteSnapshot(snapshot, config.SNAPSHOT_DIR)
+        except OSError:
+            logger.exception("Could not persist the snapshot to %s", config.SNAPSHOT_DIR)
+    return snapshot
+
+def LoadPersistedSnapshot(directory = config.SNAPSHOT_DIR):
+    """
+    Function:   The last snapshot written to disk by any process, or None
+    """
+    if not directory:
+        return None
+    persisted = LoadSnapshotFrames(directory)
+    if persisted is None:
+        return None
+    hawker_centre_df, cleaning_dates_df, remarks_df, version, fetched_at = persisted
+    return HawkerSnapshot(hawker_centre_df, cleaning_dates_df, remarks_df, version, fetched_at)
+
+class LRUCache:
+    """
+    Class:  Thread-safe cache that keeps the most recently used max_size entries.
+            Lookups are counted in the metrics under the cache name.
+    """
+    def __init__(self, max_size, name):
+        self.max_size = max_size
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def Get(self, key, default = None):
+        with self._lock:
+            CountCacheRequest(self.name, key in self._entries)
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def Put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last = False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def GetSnapshotCache(n_limit = 200):
+    with _caches_lock:
+        if n_limit not in _caches:
+            pipelines = [IncrementalPipeline(spec) for spec in GetDatasetSpecs()]
+            _caches[n_limit] = SnapshotCache(lambda: LoadHawkerSnapshot(pipelines, n_limit), persisted_loader = LoadPersistedSnapshot)
+        return _caches[n_limit]
+
+def GetHawkerSnapshot(n_limit = 200):
+    """
+    Function:   The current snapshot, including its version and fetch time
+    """
+    return GetSnapshotCache(n_limit).Get()
+
+def GetCachedHawkerData(n_limit = 200):
+    """
+    Function:   Drop-in replacement for GetHawkerData that is served from the process-wide cache
+    """
+    return GetSnapshotCache(n_limit).Get().Frames()
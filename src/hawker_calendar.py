@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from hawker_cache import GetSnapshotCache, LRUCache
+
+# Resample rules of the aggregation periods accepted by AvailabilityMatrix.Aggregate
+PERIODS = {"day": "D", "week": "W-MON", "month": "MS"}
+METRICS = ["open_centres", "closed_centres", "open_food_stalls", "open_market_stalls"]
+
+def ToStallCounts(stalls):
+    return pd.to_numeric(stalls, errors = "coerce").fillna(0).to_numpy(dtype = float)
+
+class AvailabilityMatrix:
+    """
+    Class:  Boolean centre x day matrix of the hawker centres that are open on each day of the calendar, with end
+            dates inclusive. By default the calendar spans the whole years covered by the closure windows.
+            The matrix is filled without a loop over the windows: every window adds +1 at its first day and -1 after
+            its last day of its centre's row, and a cumulative sum along the days marks the closed days.
+            The daily totals, weighted by the number of food and market stalls, are computed once on construction
+            so that date range aggregates are a slice of a few arrays.
+    """
+    def __init__(self, hawker_centre_df, cleaning_dates_df, calendar_start = None, calendar_end = None):
+        self.hawker_centre_df = hawker_centre_df.reset_index(drop = True)
+        self.clean_names = self.hawker_centre_df["clean_name"].to_numpy()
+        dates_df = cleaning_dates_df.dropna(subset = ["startdate", "enddate"])
+
+        if calendar_start is None:
+            calendar_start = dates_df["startdate"].min() if len(dates_df) else pd.Timestamp.now()
+            calendar_start = pd.Timestamp(calendar_start.year, 1, 1)
+        if calendar_end is None:
+            calendar_end = dates_df["enddate"].max() if len(dates_df) else pd.Timestamp.now()
+            calendar_end = pd.Timestamp(calendar_end.year, 12, 31)
+        self.days = pd.date_range(pd.Timestamp(calendar_start).normalize(), pd.Timestamp(calendar_end).normalize(), freq = "D")
+        n_centres, n_days = len(self.clean_names), len(self.days)
+
+        # Row of every closure window, windows of centres that are not in hawker_centre_df are left out
+        centre_positions = {clean_name: position for position, clean_name in enumerate(self.clean_names)}
+        rows = dates_df["clean_name"].map(centre_positions).to_numpy(dtype = float)
+        first_days = ((dates_df["startdate"] - self.days[0]) // pd.Timedelta(days = 1)).to_numpy()
+        last_days = ((dates_df["enddate"] - self.days[0]) // pd.Timedelta(days = 1)).to_numpy()
+        in_calendar = ~np.isnan(rows) & (last_days >= 0) & (first_days < n_days) & (first_days <= last_days)
+        rows = rows[in_calendar].astype(int)
+        first_days = np.clip(first_days[in_calendar], 0, n_days)
+        last_days = np.clip(last_days[in_calendar], -1, n_days - 1)
+
+        # At most a handful of windows of one centre overlap, so int8 is enough
+        closure_changes = np.zeros((n_centres, n_days + 1), dtype = np.int8)
+        np.add.at(closure_changes, (rows, first_days), 1)
+        np.add.at(closure_changes, (rows, last_days + 1), -1)
+        self.open = np.cumsum(closure_changes[:, :n_days], axis = 1, dtype = np.int8) == 0
+
+        self.food_stalls = ToStallCounts(self.hawker_centre_df["no_of_food_stalls"])
+        self.market_stalls = ToStallCounts(self.hawker_centre_df["no_of_market_stalls"])
+
+        # Closed cells are few, so the weighted daily totals are counted over them only
+        closed_rows, closed_days = np.nonzero(~self.open)
+        self.daily = {
+            "closed_centres": np.bincount(closed_days, minlength = n_days),
+            "open_food_stalls": self.food_stalls.sum() - np.bincount(closed_days, weights = self.food_stalls[closed_rows], minlength = n_days),
+            "open_market_stalls": self.market_stalls.sum() - np.bincount(closed_days, weights = self.market_stalls[closed_rows], minlength = n_days),
+        }
+        self.daily["open_centres"] = n_centres - self.daily["closed_centres"]
+
+    def DaySlice(self, range_start = None, range_end = None):
+        """
+        Function:   Slice of the calendar days within [range_start, range_end], clipped to the calendar
+        """
+        lower = 0 if range_start is None else self.days.searchsorted(pd.Timestamp(range_start).normalize(), side = "left")
+        upper = len(self.days) if range_end is None else self.days.searchsorted(pd.Timestamp(range_end).normalize(), side = "right")
+        return slice(lower, upper)
+
+    def Aggregate(self, range_start = None, range_end = None, period = "day"):
+        """
+        Function:   Number of open and closed centres and of open stalls within the date range, per day or as the daily
+                    average per week or month
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}, expected one of {', '.join(PERIODS)}")
+        days = self.DaySlice(range_start, range_end)
+        daily_df = pd.DataFrame({metric: self.daily[metric][days] for metric in METRICS}, index = self.days[days])
+        if period != "day":
+            daily_df = daily_df.resample(PERIODS[period], label = "left", closed = "left").mean()
+        return daily_df.rename_axis("date")
+
+    def OpenDays(self, range_start = None, range_end = None):
+        """
+        Function:   Number of days within the date range that each hawker centre is open
+        """
+        days = self.DaySlice(range_start, range_end)
+        return pd.Series(self.open[:, days].sum(axis = 1), index = self.clean_names, name = "open_days")
+
+_calendars = LRUCache(2, "calendar")
+
+def GetAvailabilityMatrix(n_limit = 200):
+    """
+    Function:   Availability matrix of the current cached snapshot, built once per data version
+    """
+    snapshot = GetSnapshotCache(n_limit).Get()
+    calendar = _calendars.Get(snapshot.version)
+    if calendar is None:
+        calendar = AvailabilityMatrix(snapshot.hawker_centre_df, snapshot.cleaning_dates_df)
+        _calendars.Put(snapshot.version, calendar)
+    return calendar
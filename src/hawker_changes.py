@@ -0,0 +1,95 @@
+import hashlib
+
+import pandas as pd
+
+import config
+from hawker_cache import LRUCache
+from hawker_metrics import TimedStage
+from hawker_status import STATUS_COLOURS
+
+# Columns of a centre view, everything the map and table show of one hawker centre
+VIEW_COLUMNS = ["latitude_hc", "longitude_hc", "colour", "descr", "status", "activity", "startdate", "enddate",
+                "address_myenv", "description_myenv", "no_of_market_stalls", "no_of_food_stalls"]
+STATUS_COLUMNS = ["status"]
+DATE_COLUMNS = ["activity", "startdate", "enddate"]
+
+COLOUR_STATUSES = {colour: status for status, colour in STATUS_COLOURS.items()}
+COLOUR_STATUSES["orange"] = COLOUR_STATUSES["#FF5F1F"]
+
+def CreateCentreView(hawker_df, hawker_centre_df):
+    """
+    Function:   One row per hawker centre on the map and table, indexed by clean_name. hawker_df holds the
+                classified closure window of every centre, as combined from the 3 status dfs of GetHCFigures.
+    """
+    centre_cols = ["clean_name", "address_myenv", "description_myenv", "no_of_market_stalls", "no_of_food_stalls"]
+    view = hawker_df.drop(columns = centre_cols[1:], errors = "ignore").merge(
+        hawker_centre_df[centre_cols].drop_duplicates("clean_name"), on = "clean_name", how = "left")
+    view["status"] = view["colour"].map(COLOUR_STATUSES)
+    return view.drop_duplicates("clean_name").set_index("clean_name")[VIEW_COLUMNS]
+
+def HashRows(view, columns):
+    return pd.util.hash_pandas_object(view[columns], index = False).to_numpy()
+
+def GetViewVersion(view):
+    """
+    Function:   Hash of the content of a centre view, the same in every worker process for the same data
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(view, index = True).values.tobytes()).hexdigest()[:16]
+
+@TimedStage("diff_centre_views")
+def DiffCentreViews(old_view, new_view):
+    """
+    Function:   Names of the hawker centres that were added, removed or updated between two centre views.
+                The updated centres are further split into those whose status changed and those whose closure
+                window changed, a centre may be in both.
+    """
+    common = new_view.index.intersection(old_view.index)
+    old_common, new_common = old_view.loc[common], new_view.loc[common]
+
+    def ChangedNames(columns):
+        return common[HashRows(old_common, columns) != HashRows(new_common, columns)].tolist()
+
+    return {
+        "added": new_view.index.difference(old_view.index).tolist(),
+        "removed": old_view.index.difference(new_view.index).tolist(),
+        "updated": ChangedNames(VIEW_COLUMNS),
+        "status_changed": ChangedNames(STATUS_COLUMNS),
+        "dates_changed": ChangedNames(DATE_COLUMNS),
+    }
+
+class ChangeFeed:
+    """
+    Class:  Recent centre views keyed by their version, and the changes between pairs of them.
+            The version is a hash of the view, so every worker process derives the same version from the same
+            data and a client may ask any worker for the changes since the version it shows. A worker that never
+            held that version returns None and the client reloads instead.
+    """
+    def __init__(self, max_views = config.CHANGE_FEED_SIZE):
+        self._views = LRUCache(max_views, "change_view")
+        self._changes = LRUCache(max_views, "change_diff")
+
+    def Publish(self, view):
+        """
+        Function:   Keep the view as a version that later changes are computed from. Returns its version.
+        """
+        version = GetViewVersion(view)
+        self._views.Put(version, view)
+        return version
+
+    def View(self, version):
+        return self._views.Get(version)
+
+    def Changes(self, from_version, to_version):
+        """
+        Function:   The DiffCentreViews changes from one published version to another, or None if either
+                    version is unknown
+        """
+        cache_key = (from_version, to_version)
+        changes = self._changes.Get(cache_key)
+        if changes is None:
+            old_view, new_view = self._views.Get(from_version), self._views.Get(to_version)
+            if old_view is None or new_view is None:
+                return None
+            changes = DiffCentreViews(old_view, new_view)
+            self._changes.Put(cache_key, changes)
+        return changes
@@ -1,62 +1,68 @@
-import requests
+import numpy as np
 import pandas as pd 
-import re
 
-def FetchData(n_limit = 200):
+import config
+from hawker_datasets import CENTRE_COLUMNS, HAWKER_CENTRES
+from hawker_fetch import GetFetcher
+from hawker_metrics import TimedStage
+
+@TimedStage("fetch_data")
+def FetchData(n_limit = 200, resource_id = config.RESOURCE_ID, api_url = config.API_URL):
     """
     Function:  get data from data.gov.sg API.
-               Returns a json file with 3 keys ['help', 'success', 'result']
+               Returns a json file with 3 keys ['help', 'success', 'result']. 
+               All pages are fetched, n_limit is the number of records per page.
     """
-    api_link = f"https://data.gov.sg/api/action/datastore_search?resource_id=b80cb643-a732-480d-86b5-e03957bc82aa&limit={n_limit}"
-    return requests.get(api_link).json()
+    records = GetFetcher(resource_id, n_limit, api_url).FetchRecords()
+    return {"help": "", "success": True, "result": {"records": records, "total": len(records)}}
 
-def GetRawData(n_limit = 200):
+def GetRawRecords(n_limit = 200, spec = HAWKER_CENTRES):
+    """
+    Function:  Get the list of raw records of a dataset from data.gov.sg
+    """
+    return FetchData(n_limit, spec.resource_id, spec.api_url)["result"]["records"]
+
+def RecordsToRawData(records, spec = HAWKER_CENTRES):
+    """
+    Function:  Convert the raw records to a dataframe with the columns of the dataset spec used by the dashboard.
+               Centre columns missing from the records are left empty.
+    """
+    raw_data_df = pd.DataFrame(records)
+    return raw_data_df.reindex(columns = spec.RawColumns(raw_data_df.columns))
+
+def GetRawData(n_limit = 200, spec = HAWKER_CENTRES):
     # Fetch and convert json to dataframe
-    raw_data = FetchData(n_limit)
-    raw_data_df = pd.DataFrame(raw_data["result"]["records"])
-
-    # Remove unwanted columns
-    raw_data_df.drop(columns = ["serial_no",  "google_3d_view"], inplace = True)
-
-    # Reorder columns
-    cols = ['name','description_myenv','address_myenv', 'no_of_market_stalls', 'no_of_food_stalls', 
-            'status', 'latitude_hc', 'longitude_hc', 'photourl',
-            'q1_cleaningstartdate','q1_cleaningenddate','q2_cleaningstartdate','q2_cleaningenddate',  
-            'q3_cleaningstartdate','q3_cleaningenddate', 'q4_cleaningstartdate', 'q4_cleaningenddate',
-            'other_works_startdate','other_works_enddate',
-            'remarks_q1','remarks_q2','remarks_q3', 'remarks_q4', 'remarks_other_works']
-    raw_data_df = raw_data_df[cols]
-    return raw_data_df
-
-def CleanUpName(name):
-    """
-    Function: Extract the HC names in brackets if any.
-    """
-    pattern = r"\((.*)\)"
-    try:
-        return re.search(pattern, name).group(1)
-    except:
-        return name
+    return RecordsToRawData(GetRawRecords(n_limit, spec), spec)
+
+def CleanUpNames(names, pattern = r"\((.*)\)"):
+    """
+    Function: Extract the HC names in brackets if any, over a series of HC names.
+    """
+    return names.str.extract(pattern, expand = False).fillna(names)
+
+def ExpandCategories(category_values, categorical, dtype):
+    """
+    Function: Broadcast one value per category back to every row of the categorical series.
+    """
+    values = np.asarray(category_values, dtype = object)[categorical.cat.codes.to_numpy()]
+    return pd.Series(values, index = categorical.index, dtype = dtype)
         
-def SplitRawData(raw_data_df):
-    raw_data_df.rename(columns = {"name":"original_name"}, inplace = True)
-    raw_data_df["clean_name"] = raw_data_df["original_name"].apply(lambda name: CleanUpName(name))
+@TimedStage("split_raw_data")
+def SplitRawData(raw_data_df, spec = HAWKER_CENTRES):
+    raw_data_df.rename(columns = spec.centre_columns, inplace = True)
+    raw_data_df["clean_name"] = CleanUpNames(raw_data_df["original_name"], spec.name_pattern)
     
-    hc_cols = ['original_name', 'clean_name', 'description_myenv','address_myenv', 'no_of_market_stalls', 'no_of_food_stalls', 
-            'status', 'latitude_hc', 'longitude_hc', 'photourl']
-    cleaning_cols = ['clean_name',
-            'q1_cleaningstartdate','q1_cleaningenddate','q2_cleaningstartdate','q2_cleaningenddate',  
-            'q3_cleaningstartdate','q3_cleaningenddate', 'q4_cleaningstartdate', 'q4_cleaningenddate',
-            'other_works_startdate','other_works_enddate']
-    remarks_cols = ['clean_name',
-                    'remarks_q1','remarks_q2','remarks_q3', 'remarks_q4', 'remarks_other_works']
+    hc_cols = CENTRE_COLUMNS
+    cleaning_cols = ['clean_name'] + spec.DateColumns(raw_data_df.columns)
+    remarks_cols = ['clean_name'] + spec.RemarkColumns(raw_data_df.columns)
     
-    hawker_centre_df = raw_data_df[hc_cols].copy()
+    hawker_centre_df = raw_data_df.reindex(columns = hc_cols)
     cleaning_dates_df = raw_data_df[cleaning_cols].copy()
     remarks_df = raw_data_df[remarks_cols].copy()
     
     return hawker_centre_df, cleaning_dates_df, remarks_df
     
+@TimedStage("clean_up_hc_data")
 def CleanUpHCData(hawker_centre_df):
     """
     Function:  Clean up HC Dataframe
@@ -64,17 +70,14 @@ def CleanUpHCData(hawker_centre_df):
     hawker_centre_df["latitude_hc"] = hawker_centre_df["latitude_hc"].astype(float)
     hawker_centre_df["longitude_hc"] = hawker_centre_df["longitude_hc"].astype(float)
 
-    return hawker_centre_df
+    # Radians for the haversine distances of the nearest centre search, so they are computed once per snapshot
+    hawker_centre_df["latitude_rad"] = np.radians(hawker_centre_df["latitude_hc"])
+    hawker_centre_df["longitude_rad"] = np.radians(hawker_centre_df["longitude_hc"])
 
-def ExtractClosureType(activity_name):
-    pattern = r"(.*)?((start|end)date)"
-    result = re.search(pattern, activity_name)
-    activity, datetype = result.group(1), result.group(2)
+    return hawker_centre_df
 
-    activity = re.sub("_", " ", activity).strip()
-    return activity, datetype
-    
-def CleanUpDatesData(cleaning_dates_df):
+@TimedStage("clean_up_dates_data")
+def CleanUpDatesData(cleaning_dates_df, spec = HAWKER_CENTRES):
     """
     Function:   Convert the df from wide to long. Remove any non-date rows
                 
@@ -83,18 +86,20 @@ def CleanUpDatesData(cleaning_dates_df):
     cleaning_dates_df = cleaning_dates_df.melt(id_vars = ["clean_name"], var_name = "activity", value_name = "date")
     
     # Clean up non-dates row
-    criteria_1 = cleaning_dates_df["date"] != "TBC"
-    criteria_2 = cleaning_dates_df["date"] != "NA"
-    master_criteria = criteria_1 & criteria_2
+    master_criteria = ~cleaning_dates_df["date"].isin(spec.missing_dates) & cleaning_dates_df["date"].notna()
     cleaning_dates_df = cleaning_dates_df[master_criteria]
-
-    # Clean up the activity
-    cleaning_dates_df["result"] = cleaning_dates_df["activity"].apply(lambda activity_name: ExtractClosureType(activity_name))
-    cleaning_dates_df["activity"] = cleaning_dates_df["result"].apply(lambda result: result[0])
-    cleaning_dates_df["datetype"] = cleaning_dates_df["result"].apply(lambda result: result[1])
-
-    # Remove cols
-    cleaning_dates_df.drop(columns = ["result"], inplace = True)
+    # Without any dates left, such as when every date is TBC, the pivot would not have the date columns
+    if cleaning_dates_df.empty:
+        return EmptyDatesData(spec)
+
+    # Clean up the activity. There are only a few distinct activities so the regex runs per category, not per row
+    activity = cleaning_dates_df["activity"].astype("category")
+    closure_types = activity.cat.categories.str.extract(spec.date_pattern)
+    activity_names = closure_types["activity"].str.replace("_", " ").str.strip()
+    cleaning_dates_df = cleaning_dates_df.assign(
+        activity = ExpandCategories(activity_names, activity, cleaning_dates_df["activity"].dtype),
+        datetype = ExpandCategories(closure_types["datetype"], activity, cleaning_dates_df["activity"].dtype),
+    )
 
     # Convert to wide table
     cleaning_dates_df = pd.pivot(cleaning_dates_df, index = ["clean_name", "activity"],
@@ -103,18 +108,16 @@ def CleanUpDatesData(cleaning_dates_df):
 
     cols = ["clean_name", "activity", "startdate", "enddate"]
     cleaning_dates_df = cleaning_dates_df[cols]
+
+    # Parse the dates once at ingest
+    cleaning_dates_df = cleaning_dates_df.assign(
+        startdate = pd.to_datetime(cleaning_dates_df["startdate"], format = spec.date_format),
+        enddate = pd.to_datetime(cleaning_dates_df["enddate"], format = spec.date_format),
+    )
     return cleaning_dates_df
 
-def ExtractRemarkType(activity_name):
-    pattern = r"(remarks)_(.*)"
-    result = re.search(pattern, activity_name)
-    activity = result.group(2)
-    activity = re.sub("_", " ", activity).strip()
-    if activity.startswith("q"):
-        activity += " cleaning"
-    return activity
-    
-def CleanUpRemarksData(remarks_df):
+@TimedStage("clean_up_remarks_data")
+def CleanUpRemarksData(remarks_df, spec = HAWKER_CENTRES):
     """
     Function:   Convert the df from wide to long. Remove any non-date rows
                 
@@ -123,27 +126,55 @@ def CleanUpRemarksData(remarks_df):
     remarks_df = remarks_df.melt(id_vars = ["clean_name"], var_name = "activity", value_name = "remarks")
     
     # Remove nil remarks
-    criteria_1 = remarks_df["remarks"] != "nil"
+    criteria_1 = (remarks_df["remarks"] != spec.missing_remark) & remarks_df["remarks"].notna()
     remarks_df = remarks_df[criteria_1]
     
     # Extract remarks period
-    remarks_df["activity"] = remarks_df["activity"].apply(lambda activity_name: ExtractRemarkType(activity_name))
+    activity = remarks_df["activity"].astype("category")
+    remark_types = activity.cat.categories.map(spec.RemarkActivity)
+    remarks_df = remarks_df.assign(activity = ExpandCategories(remark_types, activity, remarks_df["activity"].dtype))
     return remarks_df
 
-def GetHawkerData(n_limit = 200):
-    # Get raw data
-    raw_data_df = GetRawData(n_limit)
-    
+def EmptyDatesData(spec = HAWKER_CENTRES):
+    """
+    Function:   The dates df of CleanUpDatesData, with the same columns and dtypes, without any closure windows
+    """
+    # Parse a date in the format of the dataset, so the empty date columns have the unit of parsed ones
+    dates = pd.to_datetime(pd.Series([pd.Timestamp(0).strftime(spec.date_format)], dtype = "str"), format = spec.date_format)[:0]
+    cleaning_dates_df = pd.DataFrame(columns = ["clean_name", "activity"], dtype = "str").assign(startdate = dates, enddate = dates)
+    cleaning_dates_df.columns.name = "datetype"
+    return cleaning_dates_df
+
+def EmptyHawkerData(spec = HAWKER_CENTRES):
+    """
+    Function:   The 3 dfs of ProcessRawData, with the same columns and dtypes, for a dataset without records
+    """
+    hawker_centre_df = CleanUpHCData(pd.DataFrame(columns = CENTRE_COLUMNS, dtype = "str"))
+    cleaning_dates_df = EmptyDatesData(spec)
+    remarks_df = pd.DataFrame(columns = ["clean_name", "activity", "remarks"], dtype = "str")
+    return hawker_centre_df, cleaning_dates_df, remarks_df
+
+def ProcessRawData(raw_data_df, spec = HAWKER_CENTRES):
+    # Without records there are no date and remark columns to reshape
+    if raw_data_df.empty:
+        return EmptyHawkerData(spec)
+
     # Split into 3 dfs 
-    hawker_centre_df, cleaning_dates_df, remarks_df = SplitRawData(raw_data_df)
+    hawker_centre_df, cleaning_dates_df, remarks_df = SplitRawData(raw_data_df, spec)
     
     # Preprocess df
     hawker_centre_df = CleanUpHCData(hawker_centre_df)
-    cleaning_dates_df = CleanUpDatesData(cleaning_dates_df)
-    remarks_df = CleanUpRemarksData(remarks_df)
+    cleaning_dates_df = CleanUpDatesData(cleaning_dates_df, spec)
+    remarks_df = CleanUpRemarksData(remarks_df, spec)
     
     return hawker_centre_df, cleaning_dates_df, remarks_df
 
+def GetHawkerData(n_limit = 200, spec = HAWKER_CENTRES):
+    # Get raw data
+    raw_data_df = GetRawData(n_limit, spec)
+    
+    return ProcessRawData(raw_data_df, spec)
+
 
 if __name__ == "__main__":
     hawker_centre_df, cleaning_dates_df, remarks_df = GetHawkerData()
\ No newline at end of file
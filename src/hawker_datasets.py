@@ -0,0 +1,100 @@
+import json
+import re
+
+import config
+
+# Columns of the unified centre model, which every dataset is mapped onto
+CENTRE_COLUMNS = ["original_name", "clean_name", "description_myenv", "address_myenv", "no_of_market_stalls",
+                  "no_of_food_stalls", "status", "latitude_hc", "longitude_hc", "photourl"]
+
+class DatasetSpec:
+    """
+    Class:  Declarative description of one closure dataset on data.gov.sg, so that a new dataset is added as
+            configuration and runs through the same pipeline as the hawker centres:
+                centre_columns      - raw column -> column of the unified centre model, "original_name" is required
+                date_pattern        - regex over the raw columns with the named groups activity and datetype
+                                      (startdate or enddate), selecting the closure date pairs
+                remark_pattern      - regex over the raw columns with the named group activity, selecting the remarks
+                remark_activities   - (regex, replacement) rewrites of a remark activity so that it matches the
+                                      activity of its date pair, applied in order
+                name_pattern        - regex whose first group is the clean name, the whole name if it does not match
+                api_url             - datastore_search endpoint of the resource, config.API_URL by default
+            Underscores in activities are replaced by spaces.
+    """
+    def __init__(self, name, resource_id, centre_columns, date_pattern, remark_pattern, remark_activities = (),
+                 name_pattern = r"\((.*)\)", date_format = "%d/%m/%Y", missing_dates = ("TBC", "NA"), missing_remark = "nil",
+                 api_url = None):
+        if "original_name" not in centre_columns.values():
+            raise ValueError(f"Dataset {name} does not map any column to original_name")
+        self.name = name
+        self.resource_id = resource_id
+        self.api_url = api_url or config.API_URL
+        self.centre_columns = dict(centre_columns)
+        self.date_pattern = re.compile(date_pattern)
+        self.remark_pattern = re.compile(remark_pattern)
+        self.remark_activities = [(re.compile(pattern), replacement) for pattern, replacement in remark_activities]
+        self.name_pattern = name_pattern
+        self.date_format = date_format
+        self.missing_dates = list(missing_dates)
+        self.missing_remark = missing_remark
+
+    @classmethod
+    def FromDict(cls, spec_dict):
+        return cls(**spec_dict)
+
+    def DateColumns(self, columns):
+        return [column for column in columns if self.date_pattern.fullmatch(column)]
+
+    def RemarkColumns(self, columns):
+        return [column for column in columns if self.remark_pattern.fullmatch(column)]
+
+    def RawColumns(self, columns):
+        """
+        Function:   The raw columns used by the pipeline: the centre columns, then the date and remark columns
+                    in the order of the given columns
+        """
+        return list(self.centre_columns) + self.DateColumns(columns) + self.RemarkColumns(columns)
+
+    def RemarkActivity(self, column):
+        """
+        Function:   Activity of a remark column, e.g. remarks_q1 -> q1 cleaning
+        """
+        activity = self.remark_pattern.fullmatch(column).group("activity")
+        for pattern, replacement in self.remark_activities:
+            activity = pattern.sub(replacement, activity)
+        return activity.replace("_", " ").strip()
+
+HAWKER_CENTRES = DatasetSpec(
+    name = "hawker_centres",
+    resource_id = config.RESOURCE_ID,
+    centre_columns = {"name": "original_name", "description_myenv": "description_myenv", "address_myenv": "address_myenv",
+                      "no_of_market_stalls": "no_of_market_stalls", "no_of_food_stalls": "no_of_food_stalls",
+                      "status": "status", "latitude_hc": "latitude_hc", "longitude_hc": "longitude_hc", "photourl": "photourl"},
+    date_pattern = r"(?P<activity>q\d_cleaning|other_works_)(?P<datetype>startdate|enddate)",
+    remark_pattern = r"remarks_(?P<activity>q\d|other_works)",
+    remark_activities = [(r"^(q\d)$", r"\1 cleaning")],
+)
+
+DATASET_SPECS = {HAWKER_CENTRES.name: HAWKER_CENTRES}
+
+def LoadDatasetSpecs(path):
+    """
+    Function:   Register the dataset specs of a JSON file holding a list of DatasetSpec arguments
+    """
+    with open(path) as file:
+        for spec_dict in json.load(file):
+            spec = DatasetSpec.FromDict(spec_dict)
+            DATASET_SPECS[spec.name] = spec
+
+if config.DATASET_SPECS_FILE:
+    LoadDatasetSpecs(config.DATASET_SPECS_FILE)
+
+def GetDatasetSpecs(names = None):
+    """
+    Function:   The specs of the datasets to ingest, config.DATASETS by default
+    """
+    names = config.DATASETS if names is None else names
+    unknown = [name for name in names if name not in DATASET_SPECS]
+    if unknown:
+        raise KeyError(f"Unknown dataset(s) {', '.join(unknown)}, known datasets are {', '.join(DATASET_SPECS)}")
+    return [DATASET_SPECS[name] for name in names]
@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from hawker_metrics import circuit_open, upstream_fetches
+
+logger = logging.getLogger(__name__)
+
+class FetchError(Exception):
+    """
+    Class:  Raised when a page could not be fetched from the datastore API
+    """
+
+class IncompleteFetchError(FetchError):
+    """
+    Class:  Raised when some pages failed. The state holds the pages that did succeed and can be 
+            passed back to FetchRecords to resume from where the fetch stopped.
+    """
+    def __init__(self, state, errors):
+        super().__init__(f"{len(errors)} page(s) failed: {errors}")
+        self.state = state
+        self.errors = errors
+
+class CircuitOpenError(FetchError):
+    """
+    Class:  Raised without calling the API while the circuit breaker is open
+    """
+
+class CircuitBreaker:
+    """
+    Class:  Stop calling an unavailable API. After failure_threshold failed calls in a row the circuit opens and 
+            calls fail at once with CircuitOpenError. Once reset_timeout seconds have passed, one trial call is 
+            let through: its success closes the circuit again, its failure opens it for another reset_timeout.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half open"
+
+    def __init__(self, failure_threshold = config.BREAKER_FAILURES, reset_timeout = config.BREAKER_RESET, name = "upstream"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        circuit_open.Set(0, circuit = name)
+
+    def Before(self):
+        """
+        Function:   Raise CircuitOpenError unless a call may go ahead
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._SetState(self.HALF_OPEN)
+            elif self.state != self.CLOSED:
+                # Open, or half open with the trial call still running
+                upstream_fetches.Inc(result = "rejected")
+                raise CircuitOpenError(f"Circuit {self.name} is {self.state} after {self.failures} failure(s)")
+
+    def RecordSuccess(self):
+        with self._lock:
+            self.failures = 0
+            self._SetState(self.CLOSED)
+        upstream_fetches.Inc(result = "success")
+
+    def RecordFailure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Opening circuit %s after %d failure(s)", self.name, self.failures)
+                self.opened_at = time.monotonic()
+                self._SetState(self.OPEN)
+        upstream_fetches.Inc(result = "failure")
+
+    def _SetState(self, state):
+        self.state = state
+        circuit_open.Set({self.CLOSED: 0, self.HALF_OPEN: 0.5, self.OPEN: 1}[state], circuit = self.name)
+
+class FetchState:
+    """
+    Class:  Resume point of a paginated fetch. Pages are keyed by their offset.
+    """
+    def __init__(self, page_size, total = None):
+        self.page_size = page_size
+        self.total = total
+        self.pages = {}
+
+    def MissingOffsets(self):
+        return [offset for offset in range(0, self.total, self.page_size) if offset not in self.pages]
+
+    def Records(self):
+        records = []
+        for offset in sorted(self.pages):
+            records.extend(self.pages[offset])
+        return records
+
+def CreateSession(pool_size = config.FETCH_WORKERS):
+    """
+    Function:   Create a requests session with a connection pool large enough for the fetch workers
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = 1, pool_maxsize = max(pool_size, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class DatastoreFetcher:
+    """
+    Class:  Fetch every record of a data.gov.sg datastore resource by following the offset/total 
+            pagination. Pages after the first are fetched concurrently over a pooled session, each 
+            with its own timeout and retries. A failed fetch remembers its progress so that the next 
+            call only fetches the missing pages.
+    """
+    def __init__(self, resource_id = config.RESOURCE_ID, api_url = config.API_URL, page_size = 200,
+                 workers = config.FETCH_WORKERS, timeout = config.PAGE_TIMEOUT,
+                 retries = config.FETCH_RETRIES, backoff = config.RETRY_BACKOFF, budget = config.FETCH_BUDGET,
+                 session = None, breaker = None):
+        self.resource_id = resource_id
+        self.api_url = api_url
+        self.page_size = page_size
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self.session = session or CreateSession(workers)
+        self.breaker = breaker or CircuitBreaker(name = resource_id)
+        self.resume_state = None
+        self._lock = threading.Lock()
+
+    def FetchPage(self, offset, deadline = None):
+        """
+        Function:   Fetch one page, retrying with exponential backoff until the deadline (time.monotonic). 
+                    Returns (records, total).
+        """
+        params = {"resource_id": self.resource_id, "limit": self.page_size, "offset": offset}
+        for attempt in range(self.retries + 1):
+            try:
+                timeout = self.timeout if deadline is None else min(self.timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise FetchError(f"Offset {offset} ran out of the {self.budget}s fetch budget")
+                response = self.session.get(self.api_url, params = params, timeout = timeout)
+                response.raise_for_status()
+                payload = response.json()
+                if not payload.get("success", False) or "result" not in payload:
+                    raise FetchError(f"Unsuccessful response for offset {offset}: {payload.get('error', payload)}")
+                result = payload["result"]
+                if not isinstance(result["records"], list):
+                    raise FetchError(f"Malformed records for offset {offset}: {result['records']!r}")
+                return result["records"], int(result.get("total", len(result["records"])))
+            except (requests.RequestException, ValueError, KeyError, TypeError, FetchError) as error:
+                delay = self.backoff * 2 ** attempt
+                if attempt == self.retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                    raise FetchError(f"Offset {offset} failed after {attempt + 1} attempt(s): {error}") from error
+                time.sleep(delay)
+
+    def FetchRecords(self, state = None):
+        """
+        Function:   Fetch all records of the resource within the fetch budget, resuming from state (or the last 
+                    failed fetch) if given. Fails at once with CircuitOpenError while the API is considered down.
+                    Any error counts as a failure of the breaker, so that a trial call never leaves it half open.
+        """
+        self.breaker.Before()
+        try:
+            records = self._FetchRecords(state, time.monotonic() + self.budget)
+        except Exception:
+            self.breaker.RecordFailure()
+            raise
+        self.breaker.RecordSuccess()
+        return records
+
+    def _FetchRecords(self, state, deadline):
+        with self._lock:
+            state = state or self.resume_state
+            if state is None or state.page_size != self.page_size:
+                state = FetchState(self.page_size)
+
+            if state.total is None:
+                records, total = self.FetchPage(0, deadline)
+                state.total = total
+                state.pages[0] = records
+
+            errors = {}
+            missing_offsets = state.MissingOffsets()
+            if missing_offsets:
+                with ThreadPoolExecutor(max_workers = max(self.workers, 1)) as executor:
+                    futures = {offset: executor.submit(self.FetchPage, offset, deadline) for offset in missing_offsets}
+                    for offset, future in futures.items():
+                        try:
+                            records, total = future.result()
+                        except FetchError as error:
+                            errors[offset] = str(error)
+                            continue
+                        if total != state.total:
+                            # The dataset changed since the resume point was taken, so its pages cannot be mixed
+                            self.resume_state = None
+                            raise FetchError(f"Total changed from {state.total} to {total} during the fetch")
+                        state.pages[offset] = records
+
+            if errors:
+                self.resume_state = state
+                logger.warning("Fetched %d/%d pages of %s", len(state.pages), len(state.pages) + len(errors), self.resource_id)
+                raise IncompleteFetchError(state, errors)
+
+            self.resume_state = None
+            return state.Records()
+
+_fetchers = {}
+_fetchers_lock = threading.Lock()
+
+# A forked worker must not reuse the connections of its parent's sessions
+os.register_at_fork(after_in_child = _fetchers.clear)
+
+def GetFetcher(resource_id = config.RESOURCE_ID, page_size = 200, api_url = config.API_URL):
+    """
+    Function:   Return the shared fetcher of a resource so that its session and resume point are reused
+    """
+    with _fetchers_lock:
+        key = (api_url, resource_id, page_size)
+        if key not in _fetchers:
+            _fetchers[key] = DatastoreFetcher(resource_id = resource_id, api_url = api_url, page_size = page_size)
+        return _fetchers[key]
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from hawker_data import GetRawRecords, RecordsToRawData, ProcessRawData
+from hawker_datasets import HAWKER_CENTRES
+from hawker_metrics import TimedStage, CountCacheRequest
+
+def HashRecord(record):
+    """
+    Function:   Stable hash of one raw record
+    """
+    return hashlib.sha1(json.dumps(record, sort_keys = True, default = str).encode()).hexdigest()
+
+def RecordKey(record):
+    return str(record.get("serial_no", record.get("_id")))
+
+def ReplaceRows(dataframe, new_dataframe, stale_names):
+    """
+    Function:   Drop the rows of the stale hawker centres and append the reprocessed rows
+    """
+    if dataframe is None:
+        return new_dataframe
+    dataframe = dataframe[~dataframe["clean_name"].isin(stale_names)]
+    if new_dataframe is None:
+        return dataframe
+    return pd.concat([dataframe, new_dataframe], ignore_index = True)
+
+class IncrementalPipeline:
+    """
+    Class:  Turn the raw records of one dataset into the 3 hawker dataframes, reprocessing only the centres whose
+            records changed since the previous run. When the whole payload is unchanged, the previous 
+            dataframes are returned as they are.
+    """
+    def __init__(self, spec = HAWKER_CENTRES):
+        self.spec = spec
+        self.payload_hash = None
+        self.record_hashes = {}
+        self.clean_names = {}
+        self.frames = None
+        self._lock = threading.Lock()
+
+    @TimedStage("incremental_pipeline")
+    def Run(self, records):
+        """
+        Function:   Returns (hawker_centre_df, cleaning_dates_df, remarks_df, payload_hash, changed)
+        """
+        with self._lock:
+            keys = [RecordKey(record) for record in records]
+            record_hashes = dict(zip(keys, (HashRecord(record) for record in records)))
+            payload_hash = hashlib.sha1("".join(record_hashes[key] for key in keys).encode()).hexdigest()
+
+            CountCacheRequest("payload", payload_hash == self.payload_hash)
+            if payload_hash == self.payload_hash:
+                return (*self.frames, payload_hash, False)
+
+            # Records that are new or modified are reprocessed, records that are modified or removed are dropped
+            changed_keys = [key for key in keys if self.record_hashes.get(key) != record_hashes[key]]
+            changed_key_set = set(changed_keys)
+            stale_names = {self.clean_names[key] for key in self.record_hashes if record_hashes.get(key) != self.record_hashes[key]}
+
+            # The first run always processes its records, so that a dataset without any still has the 3 dfs
+            new_frames = (None, None, None)
+            if changed_keys or self.frames is None:
+                changed_records = [record for key, record in zip(keys, records) if key in changed_key_set]
+                new_frames = ProcessRawData(RecordsToRawData(changed_records, self.spec), self.spec)
+
+            old_frames = self.frames or (None, None, None)
+            hawker_centre_df, cleaning_dates_df, remarks_df = (ReplaceRows(old, new, stale_names) for old, new in zip(old_frames, new_frames))
+
+            clean_names = {key: self.clean_names[key] for key in keys if key not in changed_key_set}
+            if changed_keys:
+                clean_names.update(zip(changed_keys, new_frames[0]["clean_name"]))
+
+            # Restore the row order of a full rebuild
+            positions = {clean_names[key]: position for position, key in enumerate(keys)}
+            hawker_centre_df = hawker_centre_df.sort_values("clean_name", key = lambda names: names.map(positions), kind = "stable")
+            hawker_centre_df.reset_index(drop = True, inplace = True)
+
+            cleaning_dates_df = cleaning_dates_df.sort_values(["clean_name", "activity"], kind = "stable")
+            cleaning_dates_df.reset_index(drop = True, inplace = True)
+
+            # Remarks of a full rebuild are ordered by their raw column
+            raw_columns = list(records[0]) if records else []
+            remark_order = [self.spec.RemarkActivity(column) for column in self.spec.RemarkColumns(raw_columns)]
+            remarks_df = remarks_df.assign(_activity = remarks_df["activity"].map({activity: order for order, activity in enumerate(remark_order)}),
+                                           _position = remarks_df["clean_name"].map(positions))
+            remarks_df = remarks_df.sort_values(["_activity", "_position"], kind = "stable").drop(columns = ["_activity", "_position"])
+            remarks_df.reset_index(drop = True, inplace = True)
+
+            self.frames = (hawker_centre_df, cleaning_dates_df, remarks_df)
+            self.record_hashes = record_hashes
+            self.clean_names = clean_names
+            self.payload_hash = payload_hash
+            return (*self.frames, payload_hash, True)
+
+def TagDataset(frames, dataset, taken_names = ()):
+    """
+    Function:   Add the dataset column to the 3 dfs of one dataset. Clean names already taken by another dataset
+                get the dataset name appended, so the centres stay apart in the unified model.
+    """
+    collisions = set(frames[0]["clean_name"]).intersection(taken_names)
+    tagged_frames = []
+    for dataframe in frames:
+        dataframe = dataframe.assign(dataset = dataset)
+        if collisions:
+            colliding = dataframe["clean_name"].isin(collisions)
+            dataframe["clean_name"] = dataframe["clean_name"].where(~colliding, dataframe["clean_name"] + f" ({dataset})")
+        tagged_frames.append(dataframe)
+    return tuple(tagged_frames)
+
+@TimedStage("ingest_datasets")
+def IngestDatasets(pipelines, n_limit = 200):
+    """
+    Function:   Fetch and process every dataset concurrently, each through its own incremental pipeline, and
+                combine them into the unified centre model, where every df has a dataset column. 
+                Returns (hawker_centre_df, cleaning_dates_df, remarks_df, version).
+    """
+    def Ingest(pipeline):
+        return pipeline.Run(GetRawRecords(n_limit, pipeline.spec))
+
+    with ThreadPoolExecutor(max_workers = max(len(pipelines), 1)) as executor:
+        results = list(executor.map(Ingest, pipelines))
+
+    if len(pipelines) == 1:
+        # A single dataset keeps the version of its payload, so snapshots persisted before stay valid
+        return (*TagDataset(results[0][:3], pipelines[0].spec.name), results[0][3])
+
+    frames, taken_names = [], set()
+    for pipeline, result in zip(pipelines, results):
+        frames.append(TagDataset(result[:3], pipeline.spec.name, taken_names))
+        taken_names.update(frames[-1][0]["clean_name"])
+    hawker_centre_df, cleaning_dates_df, remarks_df = (pd.concat(dataframes, ignore_index = True) for dataframes in zip(*frames))
+    version = hashlib.sha1("".join(f"{pipeline.spec.name}:{result[3]}" for pipeline, result in zip(pipelines, results)).encode()).hexdigest()
+    return hawker_centre_df, cleaning_dates_df, remarks_df, version
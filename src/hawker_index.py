@@ -0,0 +1,264 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import config
+from hawker_cache import GetSnapshotCache, LRUCache
+from hawker_status import GetCutOffDates, StatusClassifier, OPEN
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+
+def ToDatetime64(date):
+    return np.datetime64(pd.Timestamp(date), "ns")
+
+def HaversineKm(lat, lon, lats, lons):
+    """
+    Function:   Great-circle distance in km from one point to arrays of points, all in radians
+    """
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+class ClosureIntervalIndex:
+    """
+    Class:  Index over the (startdate, enddate) closure windows, with end dates inclusive.
+            Windows are bucketed by duration in powers of two days and sorted by startdate within each bucket.
+            A window of bucket k that covers time T must start within 2**k days before T, so a stabbing query is
+            one binary search per bucket plus a scan of the few candidates it returns.
+    """
+    def __init__(self, cleaning_dates_df):
+        dates_df = cleaning_dates_df.dropna(subset = ["startdate", "enddate"])
+        self.rows = dates_df.index.to_numpy()
+        self.clean_names = dates_df["clean_name"].to_numpy()
+        self.startdate = dates_df["startdate"].to_numpy(dtype = "datetime64[ns]")
+        self.enddate = (dates_df["enddate"] + pd.Timedelta(days = 1)).to_numpy(dtype = "datetime64[ns]")
+
+        # All windows by startdate, for "starting between" queries
+        self.start_order = np.argsort(self.startdate, kind = "stable")
+        self.sorted_startdate = self.startdate[self.start_order]
+
+        duration_days = np.maximum((self.enddate - self.startdate) / np.timedelta64(1, "D"), 1)
+        bucket_ids = np.ceil(np.log2(duration_days)).astype(int)
+        self.buckets = []
+        for bucket_id in np.unique(bucket_ids):
+            positions = np.flatnonzero(bucket_ids == bucket_id)
+            positions = positions[np.argsort(self.startdate[positions], kind = "stable")]
+            self.buckets.append((np.timedelta64(2 ** int(bucket_id), "D"), positions, self.startdate[positions]))
+
+    def Overlapping(self, range_start, range_end = None):
+        """
+        Function:   Positions of the windows that overlap [range_start, range_end]. Without range_end, 
+                    the windows covering range_start.
+        """
+        range_start = ToDatetime64(range_start)
+        range_end = range_start if range_end is None else ToDatetime64(range_end)
+        matches = []
+        for max_duration, positions, startdate in self.buckets:
+            lower = np.searchsorted(startdate, range_start - max_duration, side = "right")
+            upper = np.searchsorted(startdate, range_end, side = "right")
+            candidates = positions[lower:upper]
+            matches.append(candidates[self.enddate[candidates] > range_start])
+        return np.concatenate(matches) if matches else np.array([], dtype = int)
+
+    def StartingBetween(self, range_start, range_end):
+        """
+        Function:   Positions of the windows starting within [range_start, range_end]
+        """
+        lower = np.searchsorted(self.sorted_startdate, ToDatetime64(range_start), side = "left")
+        upper = np.searchsorted(self.sorted_startdate, ToDatetime64(range_end), side = "right")
+        return self.start_order[lower:upper]
+
+class SpatialGridIndex:
+    """
+    Class:  Uniform lat/lon grid over points. Nearest neighbour queries search rings of cells outwards from the 
+            query point and stop once the next ring cannot hold anything closer than the k-th best match.
+            When the rings may cover more cells than there are points, such as for a query far outside the grid, 
+            the distances to all points are compared at once instead, so no query costs more than a brute force.
+            The points in radians may be passed in when they were computed ahead, see CleanUpHCData.
+    """
+    def __init__(self, latitudes, longitudes, cell_size = 0.01, lat_radians = None, lon_radians = None):
+        self.latitudes = np.asarray(latitudes, dtype = float)
+        self.longitudes = np.asarray(longitudes, dtype = float)
+        self.lat_radians = np.radians(self.latitudes) if lat_radians is None else np.asarray(lat_radians, dtype = float)
+        self.lon_radians = np.radians(self.longitudes) if lon_radians is None else np.asarray(lon_radians, dtype = float)
+        self.cell_size = cell_size
+
+        # Smallest distance covered by one cell, used as the lower bound per ring
+        max_abs_lat = np.abs(self.latitudes).max() if len(self.latitudes) else 0
+        self.cell_km = cell_size * KM_PER_DEGREE * math.cos(math.radians(min(max_abs_lat + cell_size, 89)))
+
+        rows, cols = self._Cells(self.latitudes, self.longitudes)
+        self.cells = {}
+        for position, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            self.cells.setdefault(cell, []).append(position)
+        self.cells = {cell: np.array(positions) for cell, positions in self.cells.items()}
+        self.bounds = (rows.min(), rows.max(), cols.min(), cols.max()) if len(rows) else None
+
+    def _Cells(self, latitudes, longitudes):
+        return np.floor(np.asarray(latitudes) / self.cell_size).astype(int), np.floor(np.asarray(longitudes) / self.cell_size).astype(int)
+
+    def _Ring(self, row, col, ring):
+        if ring == 0:
+            return [(row, col)]
+        cells = [(row + d_row, col + d_col) for d_row in (-ring, ring) for d_col in range(-ring, ring + 1)]
+        cells += [(row + d_row, col + d_col) for d_col in (-ring, ring) for d_row in range(-ring + 1, ring)]
+        return cells
+
+    def Nearest(self, latitude, longitude, k = 1, mask = None):
+        """
+        Function:   Positions and distances in km of the k nearest points. Points where mask is False are skipped.
+        """
+        if self.bounds is None:
+            return np.array([], dtype = int), np.array([])
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        row, col = (int(cell) for cell in self._Cells(latitude, longitude))
+        min_row, max_row, min_col, max_col = self.bounds
+        # Rings needed to reach every cell of the grid from the query cell
+        last_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+        if (2 * last_ring + 1) ** 2 > len(self.latitudes):
+            return self._NearestAll(lat, lon, k, mask)
+
+        best_positions, best_distances = np.array([], dtype = int), np.array([])
+        for ring in range(last_ring + 1):
+            # Points in this ring are at least (ring - 1) cells away
+            if len(best_distances) >= k and best_distances[-1] <= (ring - 1) * self.cell_km:
+                break
+            positions = [self.cells[cell] for cell in self._Ring(row, col, ring) if cell in self.cells]
+            if not positions:
+                continue
+            positions = np.concatenate(positions)
+            if mask is not None:
+                positions = positions[mask[positions]]
+            distances = HaversineKm(lat, lon, self.lat_radians[positions], self.lon_radians[positions])
+
+            best_positions = np.concatenate([best_positions, positions])
+            best_distances = np.concatenate([best_distances, distances])
+            order = np.argsort(best_distances, kind = "stable")[:k]
+            best_positions, best_distances = best_positions[order], best_distances[order]
+        return best_positions, best_distances
+
+    def _NearestAll(self, lat, lon, k, mask = None):
+        """
+        Function:   Brute force Nearest over all points, with lat and lon in radians
+        """
+        positions = np.arange(len(self.latitudes)) if mask is None else np.flatnonzero(mask)
+        distances = HaversineKm(lat, lon, self.lat_radians[positions], self.lon_radians[positions])
+        order = np.argsort(distances, kind = "stable")[:k]
+        return positions[order], distances[order]
+
+class HawkerLookup:
+    """
+    Class:  Closure interval index and spatial index over one snapshot of the hawker data, for answering
+            "is X open at T", "which centres close between A and B" and "nearest open centre to a point"
+    """
+    def __init__(self, hawker_centre_df, cleaning_dates_df):
+        self.hawker_centre_df = hawker_centre_df.reset_index(drop = True)
+        self.cleaning_dates_df = cleaning_dates_df.reset_index(drop = True)
+        self.closure_index = ClosureIntervalIndex(self.cleaning_dates_df)
+        # Snapshots persisted before the radians were added to hawker_centre_df are converted here
+        radians = {"lat_radians": self.hawker_centre_df.get("latitude_rad"), "lon_radians": self.hawker_centre_df.get("longitude_rad")}
+        self.spatial_index = SpatialGridIndex(self.hawker_centre_df["latitude_hc"], self.hawker_centre_df["longitude_hc"], **radians)
+        self.clean_names = self.hawker_centre_df["clean_name"].to_numpy()
+        # Position in hawker_centre_df of the centre of every closure window, -1 if unknown
+        self.centre_positions = {clean_name: position for position, clean_name in enumerate(self.clean_names)}
+        self.window_centres = np.array([self.centre_positions.get(clean_name, -1) for clean_name in self.closure_index.clean_names], dtype = int)
+
+        self.classifier = StatusClassifier(self.cleaning_dates_df)
+        self._day_statuses = LRUCache(4, "day_status")
+        # JSON ready fields of every centre, so that a nearest centre query does not touch pandas
+        centre_df = self.hawker_centre_df[["clean_name", "address_myenv", "latitude_hc", "longitude_hc"]]
+        self.centre_records = centre_df.astype(object).where(centre_df.notna(), None).to_dict("records")
+
+    def IsOpen(self, clean_name, date):
+        """
+        Function:   Whether the hawker centre is not closed at the given time. Only the closure windows covering
+                    that time are checked.
+        """
+        overlapping = self.closure_index.Overlapping(date)
+        position = self.centre_positions.get(clean_name)
+        if position is None:
+            # A centre with closure windows but no row in hawker_centre_df
+            return clean_name not in self.closure_index.clean_names[overlapping]
+        return not np.any(self.window_centres[overlapping] == position)
+
+    def ClosedAt(self, date):
+        """
+        Function:   Closure windows covering the given time
+        """
+        return self.cleaning_dates_df.iloc[self.closure_index.rows[self.closure_index.Overlapping(date)]]
+
+    def ClosedBetween(self, range_start, range_end):
+        """
+        Function:   Closure windows overlapping the given date range
+        """
+        return self.cleaning_dates_df.iloc[self.closure_index.rows[self.closure_index.Overlapping(range_start, range_end)]]
+
+    def ClosingBetween(self, range_start, range_end):
+        """
+        Function:   Closure windows starting within the given date range
+        """
+        return self.cleaning_dates_df.iloc[self.closure_index.rows[self.closure_index.StartingBetween(range_start, range_end)]]
+
+    def OpenMask(self, date):
+        """
+        Function:   Boolean array over hawker_centre_df, False for the centres closed at the given time
+        """
+        closed_centres = self.window_centres[self.closure_index.Overlapping(date)]
+        open_mask = np.ones(len(self.clean_names), dtype = bool)
+        open_mask[closed_centres[closed_centres >= 0]] = False
+        return open_mask
+
+    def DayStatus(self, date):
+        """
+        Function:   Open mask over hawker_centre_df and the status record of every centre on the day of the given 
+                    time: its StatusClassifier status and the closure window it refers to. Closure windows are 
+                    whole days, so both are computed once per day.
+        """
+        day = pd.Timestamp(date).normalize()
+        day_status = self._day_statuses.Get(day)
+        if day_status is None:
+            status_df = self.classifier.Classify(day.to_pydatetime()).drop_duplicates("clean_name").set_index("clean_name")
+            status_df = status_df.reindex(self.clean_names)
+            # Centres without a current or upcoming closure window are open
+            status_records = pd.DataFrame({
+                "status": status_df["status"].fillna(OPEN).to_numpy(dtype = object),
+                "closure_activity": status_df["activity"].to_numpy(dtype = object),
+                "closure_start": status_df["startdate"].dt.strftime("%Y-%m-%d").to_numpy(dtype = object),
+                "closure_end": status_df["enddate"].dt.strftime("%Y-%m-%d").to_numpy(dtype = object),
+            })
+            status_records = status_records.astype(object).where(status_records.notna(), None).to_dict("records")
+            day_status = (self.OpenMask(day), status_records)
+            self._day_statuses.Put(day, day_status)
+        return day_status
+
+    def NearestOpenCentres(self, latitude, longitude, date, k = 1):
+        """
+        Function:   The k hawker centres nearest to the point that are open at the given time, as records with their
+                    distance in km, status and the closure window the status refers to
+        """
+        open_mask, status_records = self.DayStatus(date)
+        positions, distances = self.spatial_index.Nearest(latitude, longitude, k, open_mask)
+        return [{**self.centre_records[position], "distance_km": round(distance, 3), **status_records[position]}
+                for position, distance in zip(positions.tolist(), distances.tolist())]
+
+_lookups = LRUCache(2, "lookup")
+
+def GetHawkerLookup(n_limit = 200):
+    """
+    Function:   Lookup over the current cached snapshot, built once per data version
+    """
+    snapshot = GetSnapshotCache(n_limit).Get()
+    lookup = _lookups.Get(snapshot.version)
+    if lookup is None:
+        lookup = HawkerLookup(snapshot.hawker_centre_df, snapshot.cleaning_dates_df)
+        _lookups.Put(snapshot.version, lookup)
+    return lookup
+
+def GetNearestOpenCentres(latitude, longitude, as_of = None, k = config.NEAREST_K, n_limit = 200):
+    """
+    Function:   The k hawker centres nearest to the point that are open at the as_of time (now by default) in the 
+                current cached snapshot, see HawkerLookup.NearestOpenCentres
+    """
+    date_today, _ = GetCutOffDates(as_of)
+    return GetHawkerLookup(n_limit).NearestOpenCentres(latitude, longitude, date_today, k)
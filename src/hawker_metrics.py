@@ -0,0 +1,141 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def FormatLabels(label_names, label_values, extra = ()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Metric:
+    """
+    Class:  A named metric with one value per combination of label values
+    """
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, label_names = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _Key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def Samples(self):
+        with self._lock:
+            return [(self.name, FormatLabels(self.label_names, key), value) for key, value in sorted(self._values.items())]
+
+    def Render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines += [f"{name}{labels} {value}" for name, labels, value in self.Samples()]
+        return "\n".join(lines)
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def Inc(self, amount = 1, **labels):
+        key = self._Key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def Set(self, value, **labels):
+        key = self._Key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names = (), buckets = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def Observe(self, value, **labels):
+        key = self._Key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def Samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    samples.append((f"{self.name}_bucket", FormatLabels(self.label_names, key, [("le", bound)]), count))
+                samples.append((f"{self.name}_sum", FormatLabels(self.label_names, key), total))
+                samples.append((f"{self.name}_count", FormatLabels(self.label_names, key), counts[-1]))
+        return samples
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def Register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def Render(self):
+        """
+        Function:   All metrics in the Prometheus text exposition format
+        """
+        return "\n".join(metric.Render() for metric in self.metrics) + "\n"
+
+registry = Registry()
+
+stage_seconds = registry.Register(Histogram(
+    "hawker_stage_seconds", "Time spent in each stage of the data and render pipeline", ["stage"]))
+cache_requests = registry.Register(Counter(
+    "hawker_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]))
+payload_bytes = registry.Register(Gauge(
+    "hawker_payload_bytes", "Size in bytes of the most recent payload of each kind", ["payload"]))
+request_seconds = registry.Register(Histogram(
+    "hawker_request_seconds", "HTTP request latency by endpoint", ["endpoint"]))
+response_bytes = registry.Register(Gauge(
+    "hawker_response_bytes", "Size in bytes of the most recent response by endpoint", ["endpoint"]))
+upstream_fetches = registry.Register(Counter(
+    "hawker_upstream_fetches_total", "Fetches from data.gov.sg by result (success, failure or rejected by the open circuit)", ["result"]))
+circuit_open = registry.Register(Gauge(
+    "hawker_circuit_open", "1 while the circuit breaker in front of data.gov.sg is open, 0.5 while half open, else 0", ["circuit"]))
+change_messages = registry.Register(Counter(
+    "hawker_change_messages_total", "Change messages sent to open dashboards by kind (changes or reset)", ["kind"]))
+
+@contextmanager
+def Timed(stage):
+    """
+    Function:   Record the time spent in the with-block under the given stage
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.Observe(time.perf_counter() - start, stage = stage)
+
+def TimedStage(stage):
+    """
+    Function:   Decorator form of Timed
+    """
+    def Decorator(function):
+        @wraps(function)
+        def Wrapper(*args, **kwargs):
+            with Timed(stage):
+                return function(*args, **kwargs)
+        return Wrapper
+    return Decorator
+
+def CountCacheRequest(cache, hit):
+    cache_requests.Inc(cache = cache, result = "hit" if hit else "miss")
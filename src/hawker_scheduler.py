@@ -0,0 +1,135 @@
+import fcntl
+import logging
+import os
+import random
+import threading
+import time
+
+import config
+from hawker_cache import GetSnapshotCache, LoadPersistedSnapshot
+from hawker_snapshot import ReadSnapshotPointer
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "refresh.lock"
+
+class RefreshScheduler:
+    """
+    Class:  Refresh the hawker data on a fixed interval with jitter, independent of page views.
+            Every worker process runs one scheduler and ticks once per interval slot of the wall clock, at a random
+            offset of up to jitter * interval into the slot. On each tick the processes take turns holding a file 
+            lock in the snapshot directory. The first one fetches and persists a new snapshot, the others find 
+            that the persisted snapshot was fetched during this slot and swap it in instead of fetching again.
+    """
+    def __init__(self, cache, interval = config.REFRESH_INTERVAL, jitter = config.REFRESH_JITTER,
+                 snapshot_dir = config.SNAPSHOT_DIR, on_refresh = None):
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.snapshot_dir = snapshot_dir
+        self.on_refresh = on_refresh
+        self._stop = threading.Event()
+        self._thread = None
+
+    def Start(self):
+        """
+        Function:   Run the first tick in the calling thread, so that the process has a snapshot before it serves,
+                    then continue in a background thread. A process that already holds a snapshot, such as a 
+                    gunicorn worker forked after the warm-up, serves it while the first tick runs in the background.
+        """
+        self.cache.refresh_on_read = False
+        tick_first = self.cache.Peek() is not None
+        if not tick_first:
+            self._SafeTick()
+        self._thread = threading.Thread(target = self._Run, args = (tick_first,), name = "hawker-scheduler", daemon = True)
+        self._thread.start()
+
+    def Stop(self):
+        self._stop.set()
+        self.cache.refresh_on_read = True
+
+    def SlotStart(self, now = None):
+        now = time.time() if now is None else now
+        return now - now % self.interval
+
+    def NextDelay(self):
+        """
+        Function:   Seconds until a random point early in the next interval slot
+        """
+        now = time.time()
+        return self.SlotStart(now) + self.interval * (1 + random.uniform(0, self.jitter)) - now
+
+    def _Run(self, tick_first = False):
+        if tick_first:
+            self._SafeTick()
+        while not self._stop.wait(self.NextDelay()):
+            self._SafeTick()
+
+    def _SafeTick(self):
+        try:
+            self.Tick()
+        except Exception:
+            logger.exception("Scheduled refresh of hawker data failed, serving the current snapshot")
+
+    def Tick(self):
+        """
+        Function:   Under the lock, swap in the persisted snapshot if it was fetched during this interval,
+                    otherwise fetch and persist a new one. on_refresh runs after the lock is released, so the
+                    processes do not wait for each other to build their map and table.
+        """
+        if not self.snapshot_dir:
+            self._Refresh()
+            return
+
+        os.makedirs(self.snapshot_dir, exist_ok = True)
+        with open(os.path.join(self.snapshot_dir, LOCK_FILE), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                swapped, fresh = self.SwapPersisted(fetched_since = self.SlotStart())
+                if not fresh:
+                    self.cache.Refresh()
+                    swapped = True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        if swapped:
+            self._OnRefresh()
+
+    def SwapPersisted(self, fetched_since = None):
+        """
+        Function:   Swap in the persisted snapshot if it differs from the cached one. Returns (swapped, fresh), 
+                    where fresh is True if the cache now holds a snapshot fetched after the fetched_since timestamp.
+        """
+        pointer = ReadSnapshotPointer(self.snapshot_dir)
+        if pointer is None:
+            return False, False
+
+        swapped, current = False, self.cache.Peek()
+        if current is None or (current.version, current.fetched_at.isoformat()) != (pointer["version"], pointer["fetched_at"]):
+            snapshot = LoadPersistedSnapshot(self.snapshot_dir)
+            if snapshot is None:
+                return False, False
+            self.cache.Swap(snapshot)
+            swapped, current = True, snapshot
+        return swapped, fetched_since is None or current.fetched_at.timestamp() >= fetched_since
+
+    def _Refresh(self):
+        self.cache.Refresh()
+        self._OnRefresh()
+
+    def _OnRefresh(self):
+        if self.on_refresh is not None:
+            self.on_refresh()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def StartRefreshScheduler(n_limit = 200, on_refresh = None):
+    """
+    Function:   Start the refresh scheduler of this process once. Must be called after any fork.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None and config.REFRESH_INTERVAL > 0:
+            _scheduler = RefreshScheduler(GetSnapshotCache(n_limit), on_refresh = on_refresh)
+            _scheduler.Start()
+        return _scheduler
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import config
+from hawker_metrics import TimedStage
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FRAMES = ["hawker_centre_df", "cleaning_dates_df", "remarks_df"]
+POINTER_FILE = "current.json"
+# Versions kept on disk, so that a reader holding the previous pointer can still open its files
+KEEP_VERSIONS = 2
+
+def WriteAtomically(path, writer):
+    """
+    Function:   Write to a temporary file next to path and rename it over path, so readers never see a partial file
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def EncodeFrame(dataframe):
+    """
+    Function:   Convert a dataframe to an Arrow table with dictionary encoded strings
+    """
+    table = pa.Table.from_pandas(dataframe, preserve_index = False)
+    for index, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(index, field.name, pc.dictionary_encode(table.column(index)))
+    return table
+
+def DecodeFrame(table):
+    """
+    Function:   Convert an Arrow table back to the dataframe that was written. Numeric and datetime columns
+                are views of the memory-mapped file where Arrow allows it, dictionary strings are decoded.
+    """
+    dataframe = table.to_pandas(split_blocks = True)
+    for col in dataframe.columns:
+        if isinstance(dataframe[col].dtype, pd.CategoricalDtype):
+            dataframe[col] = dataframe[col].astype(dataframe[col].cat.categories.dtype)
+    return dataframe
+
+@TimedStage("write_snapshot")
+def WriteSnapshot(snapshot, directory = config.SNAPSHOT_DIR):
+    """
+    Function:   Persist the snapshot as uncompressed Arrow IPC (Feather v2) files, one per dataframe.
+                The files are named by version and current.json is switched over last.
+    """
+    os.makedirs(directory, exist_ok = True)
+    files = {}
+    for name in SNAPSHOT_FRAMES:
+        filename = f"{snapshot.version}-{name}.arrow"
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            table = EncodeFrame(getattr(snapshot, name))
+            WriteAtomically(path, lambda tmp_path: feather.write_feather(table, tmp_path, compression = "uncompressed"))
+        files[name] = filename
+
+    pointer = {"version": snapshot.version, "fetched_at": snapshot.fetched_at.isoformat(), "files": files}
+    def WritePointer(tmp_path):
+        with open(tmp_path, "w") as file:
+            json.dump(pointer, file)
+            file.flush()
+            os.fsync(file.fileno())
+    WriteAtomically(os.path.join(directory, POINTER_FILE), WritePointer)
+    RemoveOldSnapshots(directory)
+
+def RemoveOldSnapshots(directory, keep = KEEP_VERSIONS):
+    snapshot_files = [filename for filename in os.listdir(directory) if filename.endswith(".arrow")]
+    versions = {filename.split("-", 1)[0] for filename in snapshot_files}
+    mtimes = {version: max(os.path.getmtime(os.path.join(directory, filename)) for filename in snapshot_files if filename.startswith(version))
+              for version in versions}
+    old_versions = sorted(versions, key = mtimes.get, reverse = True)[keep:]
+    for filename in snapshot_files:
+        if filename.split("-", 1)[0] in old_versions:
+            os.remove(os.path.join(directory, filename))
+
+def ReadSnapshotPointer(directory = config.SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, POINTER_FILE)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+@TimedStage("read_snapshot")
+def LoadSnapshotFrames(directory = config.SNAPSHOT_DIR):
+    """
+    Function:   Memory-map the current persisted snapshot.
+                Returns (hawker_centre_df, cleaning_dates_df, remarks_df, version, fetched_at) or None if there is none.
+    """
+    pointer = ReadSnapshotPointer(directory)
+    if pointer is None:
+        return None
+    try:
+        frames = [DecodeFrame(feather.read_table(os.path.join(directory, pointer["files"][name]), memory_map = True))
+                  for name in SNAPSHOT_FRAMES]
+    except (OSError, KeyError, pa.ArrowException):
+        logger.exception("Could not load the persisted snapshot in %s", directory)
+        return None
+    return (*frames, pointer["version"], datetime.fromisoformat(pointer["fetched_at"]))
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+import config
+from hawker_metrics import TimedStage
+
+OPEN = "Open"
+CLOSING = "Closing within a month"
+CLOSED = "Closed"
+
+# Ordered by priority: a centre that is closed is not also reported as closing or open
+STATUSES = [CLOSED, CLOSING, OPEN]
+STATUS_COLOURS = {CLOSED: "red", CLOSING: "#FF5F1F", OPEN: "green"}
+
+def GetCutOffDates(as_of = None):
+    """
+    Function:  Get today's date (or the as_of date) as well as that date in 1 month time
+    """
+    date_today = as_of or datetime.now(config.TIMEZONE).replace(tzinfo=None)
+    date_today_1month_later = date_today + relativedelta(months=1)
+    return date_today, date_today_1month_later
+
+class StatusClassifier:
+    """
+    Class:  Assign every hawker centre one status and the closure window it refers to:
+                Closed                  - the window that covers the as_of date
+                Closing within a month  - the next window starting within a month
+                Open                    - the next window starting after that
+            Centres without any of these windows are left out.
+            The closure windows are sorted once by (clean_name, startdate) on construction so that 
+            each call to Classify is a single vectorized pass, which makes it cheap to classify many dates.
+    """
+    def __init__(self, cleaning_dates_df):
+        dates_df = cleaning_dates_df.sort_values(["clean_name", "startdate"], kind = "stable").reset_index(drop = True)
+        self.dates_df = dates_df
+        self.startdate = dates_df["startdate"].to_numpy()
+        # End dates are inclusive, the centre is closed for the whole of its end date
+        self.enddate = (dates_df["enddate"] + pd.Timedelta(days = 1)).to_numpy()
+
+        names = dates_df["clean_name"].to_numpy()
+        is_group_start = np.ones(len(names), dtype = bool)
+        is_group_start[1:] = names[1:] != names[:-1]
+        self.group_starts = np.flatnonzero(is_group_start)
+
+    @TimedStage("classify")
+    def Classify(self, as_of = None):
+        """
+        Function:   Returns the closure windows with a status column, one row per hawker centre
+        """
+        date_today, date_today_1month_later = GetCutOffDates(as_of)
+        date_today = np.datetime64(pd.Timestamp(date_today))
+        date_today_1month_later = np.datetime64(pd.Timestamp(date_today_1month_later))
+
+        if len(self.dates_df) == 0:
+            return self.dates_df.assign(status = pd.Series(dtype = object))
+
+        closed = (self.startdate <= date_today) & (date_today < self.enddate)
+        closing = (self.startdate > date_today) & (self.startdate <= date_today_1month_later)
+        upcoming = self.startdate > date_today_1month_later
+        priority = np.select([closed, closing, upcoming], [0, 1, 2], default = len(STATUSES))
+
+        # The row with the lowest priority per centre, ties going to the earliest startdate
+        n_rows = len(priority)
+        keys = priority * n_rows + np.arange(n_rows)
+        best_keys = np.minimum.reduceat(keys, self.group_starts)
+        best_priority, best_rows = np.divmod(best_keys, n_rows)
+
+        has_status = best_priority < len(STATUSES)
+        status_df = self.dates_df.iloc[best_rows[has_status]].copy()
+        status_df["status"] = np.array(STATUSES, dtype = object)[best_priority[has_status]]
+        return status_df.reset_index(drop = True)
+
+def ClassifyHawkerCentres(cleaning_dates_df, as_of = None):
+    """
+    Function:   Classify the hawker centres at a single date, see StatusClassifier
+    """
+    return StatusClassifier(cleaning_dates_df).Classify(as_of)
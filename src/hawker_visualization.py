@@ -1,65 +1,18 @@
+import hashlib
+from datetime import datetime
+import numpy as np
 import pandas as pd 
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-import folium
-from hawker_data import GetHawkerData
-import pytz 
+from hawker_cache import GetHawkerSnapshot, LRUCache
+from hawker_status import ClassifyHawkerCentres, STATUSES, STATUS_COLOURS, OPEN, CLOSING, CLOSED
+import config
+from hawker_metrics import TimedStage, payload_bytes
 
-def GetCutOffDates():
-    """
-    Function:  Get today's date as well as today's date in 1 month time
-    """
-    date_today = datetime.now(pytz.timezone('Asia/Singapore')).replace(tzinfo=None)
-    date_today_1month_later = date_today + relativedelta(months=1)
-    return date_today, date_today_1month_later
+hawker_map_cache = LRUCache(config.MAP_CACHE_SIZE, "map")
+# Version of the current map per (n_limit, data version, day), so that an unknown map version does not rebuild it
+current_map_versions = LRUCache(config.MAP_CACHE_SIZE, "current_map")
 
-def GetNextClosureDates(cleaning_dates_df, date_today):
-    """
-    Function: Get the latest closure dates for each hawker centre. If the centre is currently closed, get that closure dates.
-    """
-    criteria_1 = cleaning_dates_df["startdate"] >= date_today
-    criteria_2 = cleaning_dates_df["startdate"] <= date_today
-    criteria_3 = date_today <= cleaning_dates_df["enddate"] 
-    master_criteria = criteria_1 | (criteria_1 & criteria_2)
-    
-    closure_dates_df = cleaning_dates_df[master_criteria].copy()
-    closure_dates_df = closure_dates_df.sort_values(["clean_name", "startdate"], ascending = True).drop_duplicates("clean_name")
-    closure_dates_df.reset_index(inplace = True, drop = True)
-    return closure_dates_df
-
-def GetCurrentlyClosedHC(cleaning_dates_df, date_today):
-    """
-    Function: Get the currently closed hawkers
-    """
-    criteria_1 = cleaning_dates_df["startdate"] <= date_today
-    criteria_2 = date_today <= cleaning_dates_df["enddate"] 
-    master_criteria = criteria_1 & criteria_2
-    currently_closed_df = cleaning_dates_df[master_criteria].copy()
-    currently_closed_hc_list = currently_closed_df["clean_name"].unique().tolist()
-    return currently_closed_df, currently_closed_hc_list
-
-def GetClosureIn1MonthHC(cleaning_dates_df, date_today, date_today_1month_later):
-    """
-    Function: Get the hawker centres that would close in 1 month time
-    """
-    criteria_1 = cleaning_dates_df["startdate"] >= date_today
-    criteria_2 = date_today_1month_later >= cleaning_dates_df["startdate"]
-    master_criteria = criteria_1 & criteria_2 
-    closing_1month_df = cleaning_dates_df[master_criteria].copy()
-    closing_1month_hc_list = closing_1month_df["clean_name"].unique().tolist()
-    return closing_1month_df, closing_1month_hc_list
-
-def GetCurrentlyOpenHC(currently_closed_df, closing_1month_df, cleaning_dates_df, date_today_1month_later):
-    """
-    Function: Get hawker centres that are currently open and would not be closing in 1 month time
-    """
-    criteria_1 = cleaning_dates_df["clean_name"].isin(currently_closed_df["clean_name"].unique().tolist())
-    criteria_2 = cleaning_dates_df["clean_name"].isin(closing_1month_df["clean_name"].unique().tolist())
-    criteria_3 = cleaning_dates_df["startdate"] > date_today_1month_later
-    master_criteria = ~(criteria_1 | criteria_2) & criteria_3
-    open_hawkers_df = cleaning_dates_df[master_criteria].copy().drop_duplicates("clean_name")
-    open_hawkers_list = open_hawkers_df["clean_name"].unique().tolist()
-    return open_hawkers_df, open_hawkers_list
+def CurrentMapKey(snapshot, n_limit = 200):
+    return n_limit, snapshot.version, datetime.now(config.TIMEZONE).date()
 
 def CreateDescr(dataframe):
     """
@@ -77,6 +30,7 @@ def CreateDescr(dataframe):
         descr += f" is currently closed until {enddate}."
     return descr
 
+@TimedStage("prepare_vis_data")
 def PrepareVisData(dataframe, point_colour, hawker_centre_df):
     """
     Function: Prepare dataframe for visualization.
@@ -84,7 +38,7 @@ def PrepareVisData(dataframe, point_colour, hawker_centre_df):
                 2) Description to be plotted
     """
     dataframe["colour"] = point_colour
-    dataframe["descr"] = dataframe.apply(CreateDescr, axis = 1)
+    dataframe["descr"] = dataframe.apply(CreateDescr, axis = 1, result_type = "reduce")
 
     cols = ['clean_name', 'latitude_hc', 'longitude_hc']
     dataframe = dataframe.merge(hawker_centre_df[cols], on = "clean_name")
@@ -94,6 +48,8 @@ def PlotDot(row, folium_map):
     """
     Function:   Plot the different hawker centre point the Singapore map
     """
+    import folium
+
     folium.CircleMarker(location = [row["latitude_hc"], row["longitude_hc"]],
                         radius=1.5,
                         weight=5,
@@ -101,45 +57,130 @@ def PlotDot(row, folium_map):
                         opacity=0.65,
                         tooltip = row["descr"]).add_to(folium_map)
 
-def PlotHawkerCentres(dataframe_list):
+def CreateFeatureCollection(dataframe):
+    """
+    Function:   Create a GeoJSON FeatureCollection of the hawker centre points. The colour and 
+                description are stored as feature properties for styling and tooltips.
+    """
+    coordinates = np.column_stack([dataframe["longitude_hc"].to_numpy(dtype = float),
+                                   dataframe["latitude_hc"].to_numpy(dtype = float)]).tolist()
+    features = [
+        {
+            "type": "Feature",
+            "id": str(feature_id),
+            "geometry": {"type": "Point", "coordinates": coordinate},
+            "properties": {"clean_name": clean_name, "colour": colour, "descr": descr},
+        }
+        for feature_id, (clean_name, coordinate, colour, descr) in enumerate(zip(
+            dataframe["clean_name"].tolist(), coordinates, dataframe["colour"].tolist(), dataframe["descr"].tolist()))
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+# Colour each marker in the browser from its feature properties
+STYLE_FEATURE_JS = """
+function(feature, layer) {
+    layer.setStyle({color: feature.properties.colour});
+}
+"""
+
+def PlotFeatureLayer(dataframe, folium_map):
+    """
+    Function:   Plot all hawker centres as a single GeoJSON layer of circle markers
     """
-    Function:   Plot each hawker centres as a coloured dot in a Singapore folium map
+    import folium
+    from folium.utilities import JsCode
+
+    folium.GeoJson(
+        CreateFeatureCollection(dataframe),
+        name = "hawker-centres",
+        marker = folium.CircleMarker(radius = 1.5, weight = 5, opacity = 0.65),
+        on_each_feature = JsCode(STYLE_FEATURE_JS),
+        tooltip = folium.GeoJsonTooltip(fields = ["descr"], labels = False),
+    ).add_to(folium_map)
+
+@TimedStage("plot_hawker_centres")
+def PlotHawkerCentres(dataframe_list, marker_mode = config.MAP_MARKER_MODE):
     """
+    Function:   Plot each hawker centres as a coloured dot in a Singapore folium map.
+                folium is only imported here, when a map is rendered, as it takes a large part of the app's import time.
+    """
+    import folium
+
     kw = {"location":[1.3521, 103.8198], "zoom_start":11.5}
     folium_map = folium.Map(**kw)
 
+    if marker_mode == "geojson":
+        dataframe = pd.concat(dataframe_list, ignore_index = True)
+        if len(dataframe):
+            PlotFeatureLayer(dataframe, folium_map)
+    else:
+        for dataframe in dataframe_list:
+            for row in dataframe.iterrows():
+                PlotDot(row[1], folium_map)
+
+    return folium_map.get_root().render()
+
+def GetMapVersion(dataframe_list, marker_mode = config.MAP_MARKER_MODE):
+    """
+    Function:   Hash of everything that is drawn on the map. The map only needs to be re-rendered when it changes.
+    """
+    cols = ["clean_name", "latitude_hc", "longitude_hc", "colour", "descr"]
+    map_version = hashlib.sha1(marker_mode.encode())
     for dataframe in dataframe_list:
-        for row in dataframe.iterrows():
-            PlotDot(row[1], folium_map)
+        map_version.update(pd.util.hash_pandas_object(dataframe[cols], index = False).values.tobytes())
+    return map_version.hexdigest()[:16]
+
+def CacheHawkerMap(dataframe_list):
+    """
+    Function:   Render the map into the in-memory map cache unless this version is already there
+    """
+    map_version = GetMapVersion(dataframe_list)
+    if hawker_map_cache.Get(map_version) is None:
+        map_html = PlotHawkerCentres(dataframe_list)
+        payload_bytes.Set(len(map_html.encode()), payload = "map_html")
+        hawker_map_cache.Put(map_version, map_html)
+    return map_version
 
-    folium_map.save("hawker-centres.html")
+def GetHawkerMapHtml(map_version):
+    """
+    Function:   Return the rendered map of the given version, or None if it is unknown to this process.
+                On a miss the current map is built, as the version may have been rendered by another worker, unless
+                this process already knows that the current map has another version.
+    """
+    map_html = hawker_map_cache.Get(map_version)
+    if map_html is None and current_map_versions.Get(CurrentMapKey(GetHawkerSnapshot())) in (None, map_version):
+        GetHCFigures()
+        map_html = hawker_map_cache.Get(map_version)
+    return map_html
 
 
-def GetHCFigures(n_limit = 200):
+@TimedStage("get_hc_figures")
+def GetHCFigures(n_limit = 200, as_of = None):
     """
     Function:   Get hawker data then plot and create hawker centre figure
     """
-    hawker_centre_df, cleaning_dates_df, remarks_df = GetHawkerData(n_limit)
-
-    date_today, date_today_1month_later = GetCutOffDates()
-    cleaning_dates_df["startdate"] = pd.to_datetime(cleaning_dates_df['startdate'], format = "%d/%m/%Y")
-    cleaning_dates_df["enddate"] = pd.to_datetime(cleaning_dates_df['enddate'], format = "%d/%m/%Y")
+    snapshot = GetHawkerSnapshot(n_limit)
+    current_map_key = CurrentMapKey(snapshot, n_limit)
+    hawker_centre_df, cleaning_dates_df, remarks_df = snapshot.Frames()
 
-    # Various tables
-    currently_closed_df, currently_closed_hc_list = GetCurrentlyClosedHC(cleaning_dates_df, date_today)
-    closing_1month_df, closing_1month_hc_list = GetClosureIn1MonthHC(cleaning_dates_df, date_today, date_today_1month_later)
-    open_hawkers_df, open_hawkers_list = GetCurrentlyOpenHC(currently_closed_df, closing_1month_df, cleaning_dates_df, date_today_1month_later)
+    # Status of each hawker centre
+    status_df = ClassifyHawkerCentres(cleaning_dates_df, as_of)
+    currently_closed_df, closing_1month_df, open_hawkers_df = (
+        status_df[status_df["status"] == status].drop(columns = ["status"]) for status in STATUSES
+    )
 
     # Prepare visualization data
-    open_hawkers_df = PrepareVisData(open_hawkers_df, "green", hawker_centre_df) # green
-    closing_1month_df = PrepareVisData(closing_1month_df, "#FF5F1F", hawker_centre_df) # orange #FF5F1F
-    currently_closed_df = PrepareVisData(currently_closed_df, "red", hawker_centre_df) # red 
+    open_hawkers_df = PrepareVisData(open_hawkers_df, STATUS_COLOURS[OPEN], hawker_centre_df) # green
+    closing_1month_df = PrepareVisData(closing_1month_df, STATUS_COLOURS[CLOSING], hawker_centre_df) # orange #FF5F1F
+    currently_closed_df = PrepareVisData(currently_closed_df, STATUS_COLOURS[CLOSED], hawker_centre_df) # red 
 
     # Plot figures
-    PlotHawkerCentres([open_hawkers_df, closing_1month_df, currently_closed_df])
+    map_version = CacheHawkerMap([open_hawkers_df, closing_1month_df, currently_closed_df])
+    if as_of is None:
+        current_map_versions.Put(current_map_key, map_version)
 
-    return open_hawkers_df, closing_1month_df, currently_closed_df
+    return open_hawkers_df, closing_1month_df, currently_closed_df, map_version
 
 
 if __name__ == "__main__":
-    open_hawkers_df, closing_1month_df, currently_closed_df = GetHCFigures(200)
\ No newline at end of file
+    open_hawkers_df, closing_1month_df, currently_closed_df, map_version = GetHCFigures(200)
\ No newline at end of file
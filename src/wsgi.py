@@ -0,0 +1,9 @@
+"""
+Production entry point, served by gunicorn with the settings in gunicorn.conf.py:
+
+    gunicorn wsgi:server
+"""
+from app import server, WarmUp
+
+# With preload_app this runs once in the gunicorn master before the workers are forked
+WarmUp()
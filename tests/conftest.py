@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import time, so tests never touch data.gov.sg or the working directory
+os.environ.setdefault("HAWKER_API_URL", "http://127.0.0.1:9/unreachable")
+os.environ.setdefault("HAWKER_SNAPSHOT_DIR", tempfile.mkdtemp(prefix = "hawker-test-"))
+os.environ.setdefault("HAWKER_REFRESH_INTERVAL", "0")
+os.environ.setdefault("HAWKER_FETCH_RETRIES", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
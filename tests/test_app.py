@@ -0,0 +1,33 @@
+import pytest
+
+import app
+from hawker_calendar import AvailabilityMatrix
+from hawker_data import ProcessRawData, RecordsToRawData
+from hawker_fetch import FetchError
+from synthetic import GenerateRecords
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+def test_warm_up_survives_fetch_error(monkeypatch):
+    def PrebuildTabContents(n_limit):
+        raise FetchError("data.gov.sg is down")
+    monkeypatch.setattr(app, "PrebuildTabContents", PrebuildTabContents)
+    app.WarmUp()
+
+@pytest.mark.parametrize("query", ["start=", "end=", "start=&end=2024-01-31", "start=2024-02-01&end=2024-01-31",
+                                   "start=not-a-date", "period=year"])
+def test_availability_rejects_bad_parameters(client, query):
+    assert client.get(f"/api/availability?{query}").status_code == 400
+
+@pytest.mark.parametrize("query", ["start=2024-01-01T00:00Z&end=2024-01-03", "start=2024-01-01T00:00%2B08:00&end=2024-01-03T23:00%2B08:00",
+                                   "start=2024-01-01&end=2024-01-02T16:00Z"])
+def test_availability_converts_times_with_an_offset(client, monkeypatch, query):
+    hawker_centre_df, cleaning_dates_df, _ = ProcessRawData(RecordsToRawData(GenerateRecords(20, year = 2024)))
+    calendar = AvailabilityMatrix(hawker_centre_df, cleaning_dates_df)
+    monkeypatch.setattr(app, "GetAvailabilityMatrix", lambda: calendar)
+
+    response = client.get(f"/api/availability?{query}")
+    assert response.status_code == 200
+    assert [row["date"] for row in response.get_json()["data"]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from dashboard_tabs import FilterTableData, SplitFilterPart
+
+@pytest.mark.parametrize("filter_part, expected", [
+    ("{Hawker Address} scontains Temple St", ("Hawker Address", "contains", "Temple St")),
+    ("{Hawker Address} icontains Marine Parade", ("Hawker Address", "contains", "Marine Parade")),
+    ('{Name} s= "Bedok Interchange"', ("Name", "eq", "Bedok Interchange")),
+    ("{Name} contains eq ne lt", ("Name", "contains", "eq ne lt")),
+    ("{No of Food Stalls} >= 10", ("No of Food Stalls", "ge", 10.0)),
+    ("{No of Food Stalls} s< 5", ("No of Food Stalls", "lt", 5.0)),
+    ("{No of Food Stalls} ge 10", ("No of Food Stalls", "ge", 10.0)),
+    ("{Closure Start Date} datestartswith 2024-01", ("Closure Start Date", "datestartswith", "2024-01")),
+])
+def test_split_filter_part(filter_part, expected):
+    assert tuple(SplitFilterPart(filter_part)) == expected
+
+@pytest.mark.parametrize("filter_part", ["", "Temple St", "{Name} like Temple", "{Name}"])
+def test_split_filter_part_without_operator(filter_part):
+    assert tuple(SplitFilterPart(filter_part)) == (None, None, None)
+
+def test_filter_table_data_with_operator_words_in_values():
+    table_df = pd.DataFrame({
+        "Hawker Address": ["1 Temple St", "2 Marine Parade Central", "3 Bedok Interchange Rd"],
+        "No of Food Stalls": [12, 40, 8],
+    })
+    filtered = FilterTableData(table_df, "{Hawker Address} scontains Temple St")
+    assert filtered["Hawker Address"].tolist() == ["1 Temple St"]
+
+    filtered = FilterTableData(table_df, "{Hawker Address} scontains Interchange && {No of Food Stalls} >= 8")
+    assert filtered["Hawker Address"].tolist() == ["3 Bedok Interchange Rd"]
+
+    filtered = FilterTableData(table_df, "{No of Food Stalls} >= 12")
+    assert filtered["No of Food Stalls"].tolist() == [12, 40]
@@ -0,0 +1,42 @@
+import pytest
+
+import hawker_incremental
+from hawker_datasets import DatasetSpec, HAWKER_CENTRES
+from hawker_incremental import IncrementalPipeline, IngestDatasets
+from synthetic import GenerateRecords
+
+MARKETS = DatasetSpec(name = "markets", resource_id = "markets", centre_columns = HAWKER_CENTRES.centre_columns,
+                      date_pattern = HAWKER_CENTRES.date_pattern.pattern, remark_pattern = HAWKER_CENTRES.remark_pattern.pattern,
+                      remark_activities = [(r"^(q\d)$", r"\1 cleaning")])
+
+@pytest.fixture
+def dataset_records(monkeypatch):
+    # Both datasets hold centres of the same names, with different closure windows
+    records = {HAWKER_CENTRES.name: GenerateRecords(6, seed = 0, year = 2024), MARKETS.name: GenerateRecords(4, seed = 1, year = 2024)}
+    monkeypatch.setattr(hawker_incremental, "GetRawRecords", lambda n_limit, spec: records[spec.name])
+    return records
+
+def test_single_dataset_is_tagged(dataset_records):
+    frames = IngestDatasets([IncrementalPipeline(HAWKER_CENTRES)])[:3]
+    for dataframe in frames:
+        assert set(dataframe["dataset"]) == {HAWKER_CENTRES.name}
+
+def test_colliding_clean_names_stay_apart(dataset_records):
+    hawker_centre_df, cleaning_dates_df, remarks_df, _ = IngestDatasets([IncrementalPipeline(HAWKER_CENTRES), IncrementalPipeline(MARKETS)])
+    hawker_only = IncrementalPipeline(HAWKER_CENTRES).Run(dataset_records[HAWKER_CENTRES.name])
+    markets_only = IncrementalPipeline(MARKETS).Run(dataset_records[MARKETS.name])
+
+    assert hawker_centre_df["clean_name"].is_unique
+    assert len(hawker_centre_df) == 10
+    for dataframe in (hawker_centre_df, cleaning_dates_df, remarks_df):
+        assert set(dataframe["dataset"]) == {HAWKER_CENTRES.name, MARKETS.name}
+        assert (dataframe["clean_name"].str.endswith(" (markets)") == (dataframe["dataset"] == MARKETS.name)).all()
+
+    for name in markets_only[0]["clean_name"]:
+        windows = cleaning_dates_df.loc[cleaning_dates_df["clean_name"] == name, ["activity", "startdate", "enddate"]]
+        expected = hawker_only[1].loc[hawker_only[1]["clean_name"] == name, ["activity", "startdate", "enddate"]]
+        assert windows.reset_index(drop = True).equals(expected.reset_index(drop = True))
+
+        windows = cleaning_dates_df.loc[cleaning_dates_df["clean_name"] == f"{name} (markets)", ["activity", "startdate", "enddate"]]
+        expected = markets_only[1].loc[markets_only[1]["clean_name"] == name, ["activity", "startdate", "enddate"]]
+        assert windows.reset_index(drop = True).equals(expected.reset_index(drop = True))
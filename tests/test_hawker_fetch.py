@@ -0,0 +1,89 @@
+import pytest
+
+from hawker_fetch import CircuitBreaker, CircuitOpenError, DatastoreFetcher, FetchError, IncompleteFetchError
+from stub_server import StartStubServer
+from synthetic import GenerateRecords
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+class StubSession:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def get(self, url, params = None, timeout = None):
+        return StubResponse(self.payload)
+
+@pytest.mark.parametrize("result", [{"records": None, "total": 3}, {"records": None}, None, [1, 2]])
+def test_malformed_payload_reopens_half_open_breaker(result):
+    breaker = CircuitBreaker(failure_threshold = 1, reset_timeout = 0, name = "test")
+    breaker._SetState(breaker.OPEN)
+    breaker.opened_at = 0
+    fetcher = DatastoreFetcher(resource_id = "test", api_url = "http://stub", retries = 0, breaker = breaker,
+                               session = StubSession({"success": True, "result": result}))
+
+    with pytest.raises(FetchError):
+        fetcher.FetchRecords()
+    assert breaker.state == breaker.OPEN
+
+def test_unexpected_error_counts_as_breaker_failure(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold = 1, reset_timeout = 60, name = "test")
+    fetcher = DatastoreFetcher(resource_id = "test", api_url = "http://stub", retries = 0, breaker = breaker,
+                               session = StubSession({}))
+    def _FetchRecords(state, deadline):
+        raise RuntimeError("bug")
+    monkeypatch.setattr(fetcher, "_FetchRecords", _FetchRecords)
+
+    with pytest.raises(RuntimeError):
+        fetcher.FetchRecords()
+    with pytest.raises(CircuitOpenError):
+        fetcher.FetchRecords()
+
+@pytest.fixture
+def stub():
+    stub = StartStubServer(GenerateRecords(1000), fail_offsets = [400, 800])
+    yield stub
+    stub.shutdown()
+
+def CreateStubFetcher(stub):
+    return DatastoreFetcher(resource_id = "test", api_url = stub.url, page_size = 200, retries = 0, backoff = 0,
+                            breaker = CircuitBreaker(failure_threshold = 100, name = "test"))
+
+def test_fetch_follows_pagination(stub):
+    stub.fail_offsets.clear()
+    records = CreateStubFetcher(stub).FetchRecords()
+    assert records == stub.records
+    assert sorted(stub.requests) == [0, 200, 400, 600, 800]
+
+def test_fetch_resumes_from_failed_pages(stub):
+    fetcher = CreateStubFetcher(stub)
+    with pytest.raises(IncompleteFetchError) as error:
+        fetcher.FetchRecords()
+    assert sorted(error.value.errors) == [400, 800]
+
+    stub.fail_offsets.clear()
+    stub.requests.clear()
+    assert fetcher.FetchRecords() == stub.records
+    assert sorted(stub.requests) == [400, 800]
+
+def test_fetch_restarts_when_total_changes(stub):
+    fetcher = CreateStubFetcher(stub)
+    with pytest.raises(IncompleteFetchError):
+        fetcher.FetchRecords()
+
+    stub.records = GenerateRecords(1100, seed = 1)
+    stub.fail_offsets.clear()
+    with pytest.raises(FetchError, match = "Total changed"):
+        fetcher.FetchRecords()
+    assert fetcher.resume_state is None
+
+    stub.requests.clear()
+    assert fetcher.FetchRecords() == stub.records
+    assert sorted(stub.requests) == [0, 200, 400, 600, 800, 1000]
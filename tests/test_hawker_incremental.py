@@ -0,0 +1,62 @@
+import copy
+
+import pandas as pd
+
+from hawker_data import ProcessRawData, RecordsToRawData
+from hawker_incremental import IncrementalPipeline
+from synthetic import GenerateRecords
+
+def AssertSameAsFullRebuild(pipeline, records):
+    incremental_frames = pipeline.Run(records)[:3]
+    full_frames = ProcessRawData(RecordsToRawData(copy.deepcopy(records), pipeline.spec), pipeline.spec)
+    for incremental_df, full_df in zip(incremental_frames, full_frames):
+        pd.testing.assert_frame_equal(incremental_df.reset_index(drop = True), full_df.reset_index(drop = True))
+
+def test_empty_records():
+    AssertSameAsFullRebuild(IncrementalPipeline(), [])
+
+def WithoutDates(record):
+    """
+    Function:   The record with every closure date and remark missing
+    """
+    return {column: "TBC" if column.endswith(("startdate", "enddate")) else "nil" if column.startswith("remarks_") else value
+            for column, value in record.items()}
+
+def test_changed_record_without_dates():
+    pipeline = IncrementalPipeline()
+    records = GenerateRecords(50, year = 2024)
+    AssertSameAsFullRebuild(pipeline, records)
+    records[7] = WithoutDates(records[7])
+    AssertSameAsFullRebuild(pipeline, records)
+
+def test_added_record_without_dates():
+    pipeline = IncrementalPipeline()
+    records = GenerateRecords(50, year = 2024)
+    AssertSameAsFullRebuild(pipeline, records[:49])
+    AssertSameAsFullRebuild(pipeline, records[:49] + [WithoutDates(records[49])])
+
+def test_incremental_matches_full_rebuild():
+    pipeline = IncrementalPipeline()
+    records = GenerateRecords(20, year = 2024)
+    AssertSameAsFullRebuild(pipeline, [])
+    AssertSameAsFullRebuild(pipeline, records)
+
+    # Add
+    records = records + GenerateRecords(25, seed = 1, year = 2024)[20:]
+    AssertSameAsFullRebuild(pipeline, records)
+
+    # Modify
+    records[3] = dict(records[3], q2_cleaningstartdate = "01/05/2024", q2_cleaningenddate = "03/05/2024", remarks_q2 = "Repainting")
+    AssertSameAsFullRebuild(pipeline, records)
+
+    # Remove
+    records = records[:5] + records[6:]
+    AssertSameAsFullRebuild(pipeline, records)
+
+    # Rename
+    records[7] = dict(records[7], name = "Renamed Hawker Centre (Renamed Food Centre)")
+    AssertSameAsFullRebuild(pipeline, records)
+
+    # Unchanged, then all removed
+    AssertSameAsFullRebuild(pipeline, records)
+    AssertSameAsFullRebuild(pipeline, [])
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hawker_data import ProcessRawData, RecordsToRawData
+from hawker_index import HaversineKm, HawkerLookup, SpatialGridIndex
+from synthetic import GenerateRecords
+
+@pytest.fixture
+def grid_index():
+    rng = np.random.default_rng(0)
+    return SpatialGridIndex(rng.uniform(1.25, 1.45, 120), rng.uniform(103.65, 104.0, 120))
+
+def BruteForceNearest(index, latitude, longitude, k, mask = None):
+    distances = HaversineKm(np.radians(latitude), np.radians(longitude), index.lat_radians, index.lon_radians)
+    if mask is not None:
+        distances = np.where(mask, distances, np.inf)
+    order = np.argsort(distances, kind = "stable")[:k]
+    return distances[order]
+
+@pytest.mark.parametrize("latitude, longitude", [(1.35, 103.82), (1.26, 103.99), (1.5, 103.7)])
+def test_nearest_matches_brute_force(grid_index, latitude, longitude):
+    mask = np.arange(120) % 3 != 0
+    _, distances = grid_index.Nearest(latitude, longitude, k = 5, mask = mask)
+    np.testing.assert_allclose(distances, BruteForceNearest(grid_index, latitude, longitude, 5, mask))
+
+@pytest.mark.parametrize("latitude, longitude", [(51.5, -0.12), (20.0, 103.8), (-89.9, -179.9)])
+def test_nearest_out_of_area_is_fast(latitude, longitude):
+    rng = np.random.default_rng(1)
+    index = SpatialGridIndex(rng.uniform(1.25, 1.45, 20000), rng.uniform(103.65, 104.0, 20000))
+    start = time.perf_counter()
+    _, distances = index.Nearest(latitude, longitude, k = 5)
+    assert time.perf_counter() - start < 0.5
+    np.testing.assert_allclose(distances, BruteForceNearest(index, latitude, longitude, 5))
+
+def test_is_open_matches_open_mask():
+    hawker_centre_df, cleaning_dates_df, _ = ProcessRawData(RecordsToRawData(GenerateRecords(60, year = 2024)))
+    lookup = HawkerLookup(hawker_centre_df, cleaning_dates_df)
+    for date in pd.date_range("2024-01-01", "2024-12-31", freq = "9D"):
+        open_mask = lookup.OpenMask(date)
+        assert [lookup.IsOpen(clean_name, date) for clean_name in lookup.clean_names] == open_mask.tolist()
+    assert lookup.IsOpen("Unknown Centre", pd.Timestamp("2024-06-01"))
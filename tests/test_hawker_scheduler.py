@@ -0,0 +1,37 @@
+import fcntl
+import os
+
+import pytest
+
+from hawker_cache import HawkerSnapshot, SnapshotCache
+from hawker_data import ProcessRawData, RecordsToRawData
+from hawker_scheduler import LOCK_FILE, RefreshScheduler
+from hawker_snapshot import WriteSnapshot
+from synthetic import GenerateRecords
+
+def CreateSnapshot():
+    return HawkerSnapshot(*ProcessRawData(RecordsToRawData(GenerateRecords(10))), version = "test")
+
+def IsLocked(snapshot_dir):
+    with open(os.path.join(snapshot_dir, LOCK_FILE), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
+
+@pytest.mark.parametrize("persisted", [False, True])
+def test_on_refresh_runs_after_the_lock_is_released(tmp_path, persisted):
+    if persisted:
+        WriteSnapshot(CreateSnapshot(), str(tmp_path))
+    locked = []
+    scheduler = RefreshScheduler(SnapshotCache(CreateSnapshot), interval = 60, snapshot_dir = str(tmp_path),
+                                 on_refresh = lambda: locked.append(IsLocked(str(tmp_path))))
+    scheduler.Tick()
+    assert locked == [False]
+
+    # A tick that finds the snapshot unchanged does not rebuild
+    if persisted:
+        scheduler.Tick()
+        assert locked == [False]
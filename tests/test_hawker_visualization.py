@@ -0,0 +1,38 @@
+import pytest
+
+import hawker_visualization
+from hawker_cache import HawkerSnapshot
+from hawker_data import ProcessRawData, RecordsToRawData
+from synthetic import GenerateRecords
+
+@pytest.fixture
+def figure_calls(monkeypatch):
+    snapshot = HawkerSnapshot(*ProcessRawData(RecordsToRawData(GenerateRecords(30))), version = "test")
+    monkeypatch.setattr(hawker_visualization, "GetHawkerSnapshot", lambda n_limit = 200: snapshot)
+    monkeypatch.setattr(hawker_visualization, "hawker_map_cache", hawker_visualization.LRUCache(4, "map"))
+    monkeypatch.setattr(hawker_visualization, "current_map_versions", hawker_visualization.LRUCache(4, "current_map"))
+
+    calls = []
+    GetHCFigures = hawker_visualization.GetHCFigures
+    def CountedGetHCFigures(*args, **kwargs):
+        calls.append(args)
+        return GetHCFigures(*args, **kwargs)
+    monkeypatch.setattr(hawker_visualization, "GetHCFigures", CountedGetHCFigures)
+    return calls
+
+def test_unknown_map_version_is_not_rebuilt(figure_calls):
+    assert hawker_visualization.GetHawkerMapHtml("unknown") is None
+    assert len(figure_calls) == 1
+    for _ in range(3):
+        assert hawker_visualization.GetHawkerMapHtml("unknown") is None
+    assert len(figure_calls) == 1
+
+    map_version = hawker_visualization.GetHCFigures()[3]
+    assert hawker_visualization.GetHawkerMapHtml(map_version)
+    assert len(figure_calls) == 2
+
+def test_evicted_current_map_is_rebuilt(figure_calls):
+    map_version = hawker_visualization.GetHCFigures()[3]
+    hawker_visualization.hawker_map_cache._entries.clear()
+    assert hawker_visualization.GetHawkerMapHtml(map_version)
+    assert len(figure_calls) == 2